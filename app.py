@@ -1,4 +1,9 @@
+import time
+STARTED = time.perf_counter()
+
+from threading import Event, Thread
 from flask import Flask, render_template
+from get_data import Database
 from views.kpi_graph import kpi_graph
 from views.rbs_assigned import rbs_assigned
 from views.classifier_output import classifier_output
@@ -10,11 +15,16 @@ from bokeh.server.server import Server
 from tornado.ioloop import IOLoop
 from bokeh.embed import server_document
 from views.loss_epoch import loss_epoch_graph
+from views.dashboard import dashboard_app
+from views.event_timeline import event_timeline
 
 # Initialize the Flask application
 
 app = Flask(__name__)
 
+# Set by bk_worker once the Bokeh server is listening
+bokeh_ready = Event()
+
 
 @app.route('/', methods=['GET'])
 # def bkapp_page():
@@ -54,6 +64,12 @@ def bkapp_page():
                            loss_epoch_script = loss_epoch_script,  # Add this line
                            )
 
+@app.route('/dashboard', methods=['GET'])
+def dashboard_page():
+    # All panels come from one Bokeh Document: one websocket session per page view
+    dashboard_script = server_document('http://localhost:5006/dashboard')
+    return render_template("dashboard.html", dashboard_script=dashboard_script)
+
 # def bk_worker():
 #     bk_apps = {
 #         '/graphs': kpi_graph,
@@ -79,25 +95,29 @@ def bk_worker():
             '/image_pairs': image_pairs_app,
             '/animate_rays': animate_rays_cycle4_app,
             '/loss_epoch': loss_epoch_graph,
+            '/event_timeline': event_timeline,
+            '/dashboard': dashboard_app,
         }
         print(f"Starting Bokeh server with {len(bk_apps)} apps: {list(bk_apps.keys())}")
         server = Server(bk_apps, io_loop=IOLoop(), port=5006, allow_websocket_origin=["localhost:8000", "127.0.0.1:8000"])
         server.start()
-        print("Bokeh server started successfully on port 5006")
+        print(f"Bokeh server started successfully on port 5006 ({time.perf_counter() - STARTED:.2f} s after start)")
+        bokeh_ready.set()
         server.io_loop.start()
     except Exception as e:
         print(f"Error starting Bokeh server: {e}")
         import traceback
         traceback.print_exc()
+        bokeh_ready.set()
 
 
 if __name__ == "__main__":
     # Running flask app instance on port 8000
-    from threading import Thread
-    import time
     print("Starting Bokeh server in background thread...")
     Thread(target=bk_worker, daemon=True).start()
-    # Give Bokeh server a moment to start
-    time.sleep(2)
-    print("Starting Flask app on port 8000...")
+    # Load the data in the background; the panels show a loading state until it is ready
+    Database().load_async()
+    # Wait for the Bokeh server to listen (this does not depend on the dataset size)
+    bokeh_ready.wait(timeout=10)
+    print(f"Starting Flask app on port 8000 ({time.perf_counter() - STARTED:.2f} s after start)...")
     app.run(port=8000, debug=False)
@@ -1,96 +1,392 @@
 # database.py (top section replacement)
 from dotenv import load_dotenv
+import argparse
+import calendar
 import os
+import time
+import numpy as np
 import pandas as pd
 import pymongo
 import sys
 from bson import ObjectId
 from datetime import datetime
+from pymongo import ASCENDING, ReplaceOne, UpdateOne
+
+from derived_metrics import DERIVED_COLUMNS, DERIVED_INPUTS, derive_metrics
+from event_index import (
+    CLASSIFIER_EVENTS, EVENT_COLLECTION, POLICY_EVENTS, run_length_encode, segment_documents,
+)
 
 load_dotenv()  # loads .env into environment
 
 # Get Mongo URI from .env (falls back to localhost)
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 
-try:
-    client = pymongo.MongoClient(MONGO_URI)
-except pymongo.errors.ConfigurationError:
-    print("Invalid MongoDB URI or configuration. Check MONGO_URI in .env")
-    sys.exit(1)
+# Path to your log file
+LOG_FILE_PATH = "data/xapp-logger.log"
+# Path to the KPI export
+METRICS_FILE_PATH = "data/1010123456002_metrics.xlsx"
 
-# use a database named "myDatabase"
-db = client.myDatabase
+# Bucketed layout: every KPI column is split into documents covering a fixed
+# span of time, so no single document grows with the length of the run.
+BUCKET_SPAN_MS = int(os.getenv("BUCKET_SPAN_MS", 15 * 60 * 1000))
+KPI_BUCKET_COLLECTION = "csv_buckets"
+LOG_BUCKET_COLLECTION = "log_buckets"
 
-################################## Reading and storing the log file in mongoDB   ############################################# 
+# {"_id": SOURCE_VERSION_ID, "version": n} is bumped on every ingest, so readers
+# holding a local copy of the data (get_data's snapshot) know it is stale
+STATE_COLLECTION = "ingest_state"
+SOURCE_VERSION_ID = "source_version"
 
-# Path to your log file
-log_file_path = "data/xapp-logger.log"
-
-log_collection = db['log']
-
-# Read the log file and create a list of dictionaries
-log_entries = []
-with open(log_file_path, "r") as log_file:
-    for line in log_file:
-        # Assuming each line has the format "timestamp INFO class: message"
-        parts = line.strip().split(" ", 3)
-        timestamp_str = parts[0] + " " + parts[1]
-        timestamp = datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S,%f")
-        
-        # Calculate Unix epoch timestamp
-        unix_epoch_timestamp = int(timestamp.timestamp())
-        
-        log_entry = {
-            "timestamp": timestamp,
-            "unix_epoch_timestamp": unix_epoch_timestamp,
-            "class": parts[3]
-        }
-        log_entries.append(log_entry)
 
-# Create a MongoDB document with the name "log_file"
-log_document = {
-    "_id": "log_file",
-    "entries": log_entries
-}
+def get_database():
+    try:
+        client = pymongo.MongoClient(MONGO_URI)
+    except pymongo.errors.ConfigurationError:
+        print("Invalid MongoDB URI or configuration. Check MONGO_URI in .env")
+        sys.exit(1)
 
-# Insert the document into the MongoDB collection
-log_collection.replace_one({"_id": log_document["_id"]}, log_document, upsert=True)
+    # use a database named "myDatabase"
+    return client.myDatabase
 
-print("Log document inserted successfully.")
 
+def report_timing(label, rows, started):
+    """Print how long an ingest step took and its throughput in rows/second."""
+    elapsed = time.perf_counter() - started
+    rate = rows / elapsed if elapsed > 0 else float("inf")
+    print(f"{label}: {rows} rows in {elapsed:.3f} s ({rate:,.0f} rows/s)")
 
-################################## Reading the Excelfile  ############################################# 
 
-# use a collection named "csv"
-my_collection = db["csv"]
+def mark_source_changed(db):
+    """Bump the source version after writing KPI or log data."""
+    db[STATE_COLLECTION].update_one(
+        {"_id": SOURCE_VERSION_ID},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True,
+    )
 
 
-df = pd.read_excel("data/1010123456002_metrics.xlsx")
-df["TS"] = (df["Timestamp"] / 1000).apply(lambda x: datetime.utcfromtimestamp(x).strftime('%Y-%m-%d %H:%M:%S:%f')[:-3])
+################################## Reading and storing the log file in mongoDB   #############################################
 
+def parse_log_file(log_file_path=LOG_FILE_PATH):
+    # Read the log file and create a list of dictionaries
+    log_entries = []
+    with open(log_file_path, "r") as log_file:
+        for line in log_file:
+            # Assuming each line has the format "timestamp INFO class: message"
+            parts = line.strip().split(" ", 3)
+            timestamp_str = parts[0] + " " + parts[1]
+            timestamp = datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S,%f")
 
-# Iterate over columns and create MongoDB documents
-for column_name in df.columns:
-    # Skip the "Timestamp" column
-    if column_name == "Timestamp":
-        continue
-# Create a list of dictionaries for the current column
-    column_data = []
-    for index, row in df.iterrows():
-        entry = {
-            "unix_epoch": int(row["Timestamp"] / 1000),
-            "readable_timestamp": row["TS"],
-            "value": row[column_name]
-        }
-        column_data.append(entry)
+            # Calculate Unix epoch timestamp
+            unix_epoch_timestamp = int(timestamp.timestamp())
+
+            log_entry = {
+                "timestamp": timestamp,
+                "unix_epoch_timestamp": unix_epoch_timestamp,
+                "class": parts[3]
+            }
+            # Absolute epoch ms, the key get_data.py reads back
+            log_entry["t"] = log_entry_millis(log_entry)
+            log_entries.append(log_entry)
+    return log_entries
+
+
+def ingest_log_file(db, log_file_path=LOG_FILE_PATH):
+    log_collection = db['log']
+    log_entries = parse_log_file(log_file_path)
 
-    # Create a MongoDB document for the current column
-    column_document = {
-        "_id": column_name,
-        "data": column_data
+    # Create a MongoDB document with the name "log_file"
+    log_document = {
+        "_id": "log_file",
+        "entries": log_entries
     }
 
     # Insert the document into the MongoDB collection
-    my_collection.replace_one({"_id": column_name}, column_document, upsert=True)
+    log_collection.replace_one({"_id": log_document["_id"]}, log_document, upsert=True)
+    store_log_events(db, log_entries)
+    mark_source_changed(db)
+
+    print("Log document inserted successfully.")
+
+
+################################## Reading the Excelfile  #############################################
+
+def read_metrics(path=METRICS_FILE_PATH):
+    return pd.read_excel(path)
+
+
+def with_derived_columns(df):
+    """
+    Return df with the derived efficiency columns added, so they are stored
+    like any other column. Frames without all the inputs (e.g. a producer
+    appending a single column) are returned unchanged.
+    """
+    if not set(DERIVED_INPUTS).issubset(df.columns) or set(DERIVED_COLUMNS).issubset(df.columns):
+        return df
+    derived = derive_metrics({column: df[column].to_numpy(dtype="float64") for column in DERIVED_INPUTS})
+    return df.assign(**derived)
+
+
+def ingest_csv_rows(my_collection, df):
+    """
+    Original row-by-row ingest: one iterrows() pass per column and one
+    replace_one round-trip per column. Kept for comparison (--mode rows).
+    """
+    started = time.perf_counter()
+    df = with_derived_columns(df).copy()
+    df["TS"] = (df["Timestamp"] / 1000).apply(lambda x: datetime.utcfromtimestamp(x).strftime('%Y-%m-%d %H:%M:%S:%f')[:-3])
+
+    # Iterate over columns and create MongoDB documents
+    for column_name in df.columns:
+        # Skip the "Timestamp" column
+        if column_name == "Timestamp":
+            continue
+    # Create a list of dictionaries for the current column
+        column_data = []
+        for index, row in df.iterrows():
+            entry = {
+                "t": int(row["Timestamp"]),
+                "unix_epoch": int(row["Timestamp"] / 1000),
+                "readable_timestamp": row["TS"],
+                "value": row[column_name]
+            }
+            column_data.append(entry)
+
+        # Create a MongoDB document for the current column
+        column_document = {
+            "_id": column_name,
+            "data": column_data
+        }
+
+        # Insert the document into the MongoDB collection
+        my_collection.replace_one({"_id": column_name}, column_document, upsert=True)
+
+    store_policy_events(my_collection.database, df)
+    mark_source_changed(my_collection.database)
+    report_timing("Row ingest", len(df), started)
+
+
+def build_column_documents(df):
+    """
+    Convert the whole frame into one {_id, data} document per column.
+
+    The timestamp conversion is done once for the frame with pandas instead of
+    once per cell, and each column is turned into plain Python values with a
+    single .tolist() so no per-row pandas access is needed.
+    """
+    millis = df["Timestamp"].to_numpy(dtype="int64")
+    epoch_ms = millis.tolist()
+    unix_epoch = (millis // 1000).tolist()
+    readable = (
+        pd.to_datetime(millis, unit="ms")
+        .strftime("%Y-%m-%d %H:%M:%S:%f")
+        .str[:-3]
+        .tolist()
+    )
+
+    documents = []
+    for column_name in df.columns:
+        if column_name == "Timestamp":
+            continue
+        values = df[column_name].tolist()
+        column_data = [
+            {"t": t, "unix_epoch": epoch, "readable_timestamp": ts, "value": value}
+            for t, epoch, ts, value in zip(epoch_ms, unix_epoch, readable, values)
+        ]
+        documents.append({"_id": column_name, "data": column_data})
+
+    # database.py has always stored the formatted timestamps as their own column too
+    documents.append({
+        "_id": "TS",
+        "data": [
+            {"t": t, "unix_epoch": epoch, "readable_timestamp": ts, "value": ts}
+            for t, epoch, ts in zip(epoch_ms, unix_epoch, readable)
+        ],
+    })
+    return documents
+
+
+def ingest_csv_vectorized(my_collection, df):
+    """
+    Vectorized ingest: build every column document from arrays and write them
+    all in a single bulk_write round-trip.
+    """
+    started = time.perf_counter()
+    documents = build_column_documents(with_derived_columns(df))
+    my_collection.bulk_write(
+        [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in documents],
+        ordered=False,
+    )
+    store_policy_events(my_collection.database, df)
+    mark_source_changed(my_collection.database)
+    report_timing("Vectorized ingest", len(df), started)
+
+
+################################## Bucketed layout  #############################################
+
+def ensure_bucket_indexes(db):
+    db[KPI_BUCKET_COLLECTION].create_index(
+        [("column", ASCENDING), ("bucket_start", ASCENDING)], unique=True
+    )
+    db[LOG_BUCKET_COLLECTION].create_index([("bucket_start", ASCENDING)], unique=True)
+
+
+def bucket_updates(millis, columns, span_ms=BUCKET_SPAN_MS, key_fields=None):
+    """
+    Group the points of one or more columns into fixed-span buckets.
+
+    millis is a sorted int64 array of epoch milliseconds and columns maps a
+    field name to an equally long list of values. Returns one UpdateOne per
+    bucket that appends the points with $push/$each and keeps t_min, t_max
+    and count up to date, so the same function serves batch and live ingest.
+    """
+    key_fields = key_fields or {}
+    if len(millis) == 0:
+        return []
+
+    bucket_starts = (millis // span_ms) * span_ms
+    # Boundaries of the runs of equal bucket_start in the sorted array
+    starts, first_index = np.unique(bucket_starts, return_index=True)
+    bounds = first_index.tolist() + [len(millis)]
+    times = millis.tolist()
+
+    updates = []
+    for i, bucket_start in enumerate(starts.tolist()):
+        lo, hi = bounds[i], bounds[i + 1]
+        push = {"t": {"$each": times[lo:hi]}}
+        for field, values in columns.items():
+            push[field] = {"$each": values[lo:hi]}
+        updates.append(UpdateOne(
+            dict(key_fields, bucket_start=bucket_start),
+            {
+                "$push": push,
+                "$min": {"t_min": times[lo]},
+                "$max": {"t_max": times[hi - 1]},
+                "$inc": {"count": hi - lo},
+                "$set": {"span": span_ms},
+            },
+            upsert=True,
+        ))
+    return updates
+
+
+def append_kpi_buckets(collection, df, span_ms=BUCKET_SPAN_MS):
+    """Append the rows of df to the per-column buckets (used by batch and live ingest)."""
+    df = with_derived_columns(df).sort_values("Timestamp", kind="stable")
+    millis = df["Timestamp"].to_numpy(dtype="int64")
+    updates = []
+    for column_name in df.columns:
+        if column_name == "Timestamp":
+            continue
+        updates.extend(bucket_updates(
+            millis, {"v": df[column_name].tolist()}, span_ms, key_fields={"column": column_name}
+        ))
+    if updates:
+        collection.bulk_write(updates, ordered=False)
+        mark_source_changed(collection.database)
+    return len(updates)
+
+
+def ingest_csv_bucketed(db, df, span_ms=BUCKET_SPAN_MS):
+    started = time.perf_counter()
+    collection = db[KPI_BUCKET_COLLECTION]
+    ensure_bucket_indexes(db)
+    df = with_derived_columns(df)
+    # A batch ingest replaces whatever was stored for these columns before
+    columns = [c for c in df.columns if c != "Timestamp"]
+    collection.delete_many({"column": {"$in": columns}})
+    buckets = append_kpi_buckets(collection, df, span_ms)
+    store_policy_events(db, df)
+    report_timing(f"Bucketed ingest ({buckets} buckets)", len(df), started)
+
+
+def log_entry_millis(entry):
+    # The log wall clock is read back from Mongo as naive UTC, so keep it as UTC here too
+    return int(calendar.timegm(entry["timestamp"].timetuple())) * 1000 + entry["timestamp"].microsecond // 1000
+
+
+def ingest_log_bucketed(db, log_entries, span_ms=BUCKET_SPAN_MS):
+    collection = db[LOG_BUCKET_COLLECTION]
+    ensure_bucket_indexes(db)
+    entries = sorted(log_entries, key=log_entry_millis)
+    millis = np.array([log_entry_millis(e) for e in entries], dtype="int64")
+    collection.delete_many({})
+    updates = bucket_updates(millis, {"class": [e["class"] for e in entries]}, span_ms)
+    if updates:
+        collection.bulk_write(updates, ordered=False)
+    store_log_events(db, entries)
+    mark_source_changed(db)
+    print(f"Log buckets inserted successfully ({len(updates)} buckets).")
+
+
+################################## Event index  #############################################
+
+def store_events(db, kind, times, values):
+    """
+    Replace the stored segments of one kind with the run-length encoding of
+    (times, values); returns (samples, segments).
+    """
+    start, end, runs, counts = run_length_encode(times, values)
+    collection = db[EVENT_COLLECTION]
+    collection.create_index([("kind", ASCENDING), ("start", ASCENDING)])
+    collection.delete_many({"kind": kind})
+    if len(start):
+        collection.insert_many(segment_documents(kind, start, end, runs, counts))
+    return len(times), len(start)
+
+
+def store_log_events(db, log_entries):
+    entries = sorted(log_entries, key=lambda entry: entry["t"])
+    labels = np.empty(len(entries), dtype=object)
+    labels[:] = [entry["class"] for entry in entries]
+    samples, segments = store_events(db, CLASSIFIER_EVENTS, [entry["t"] for entry in entries], labels)
+    print(f"Classifier event index: {samples} log entries in {segments} segments.")
+
+
+def store_policy_events(db, df):
+    if "scheduling_policy" not in df.columns:
+        return
+    rows = df.sort_values("Timestamp", kind="stable")
+    policy = rows["scheduling_policy"].to_numpy(dtype="float64")
+    known = ~np.isnan(policy)
+    store_events(db, POLICY_EVENTS, rows["Timestamp"].to_numpy(dtype="int64")[known], policy[known])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Populate MongoDB with the ORAN log and KPI export.")
+    parser.add_argument("--mode", choices=["vectorized", "rows"], default="vectorized",
+                        help="KPI ingest implementation (default: vectorized)")
+    parser.add_argument("--layout", choices=["document", "bucketed"], default="document",
+                        help="storage layout: one array document per column, or time buckets")
+    parser.add_argument("--bucket-span-ms", type=int, default=BUCKET_SPAN_MS,
+                        help="time span covered by one bucket document (bucketed layout)")
+    parser.add_argument("--metrics", default=METRICS_FILE_PATH, help="path to the KPI .xlsx export")
+    parser.add_argument("--log", default=LOG_FILE_PATH, help="path to the xApp log file")
+    args = parser.parse_args(argv)
+
+    db = get_database()
+
+    df = read_metrics(args.metrics)
+
+    if args.layout == "bucketed":
+        ingest_log_bucketed(db, parse_log_file(args.log), args.bucket_span_ms)
+        ingest_csv_bucketed(db, df, args.bucket_span_ms)
+        print("Data inserted successfully.")
+        return
+
+    ingest_log_file(db, args.log)
+
+    # use a collection named "csv"
+    my_collection = db["csv"]
+
+    if args.mode == "rows":
+        ingest_csv_rows(my_collection, df)
+    else:
+        ingest_csv_vectorized(my_collection, df)
+
+    print("Data inserted successfully.")
+
 
-print("Data inserted successfully.")
+if __name__ == "__main__":
+    main()
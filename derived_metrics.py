@@ -0,0 +1,37 @@
+# derived_metrics.py
+"""
+Efficiency KPIs derived from the raw KPI export columns.
+
+database.py adds them to the KPI frame before it is stored, so they are
+persisted as ordinary columns in either storage layout; get_data.Database
+computes them at load time for data ingested before they existed. Every
+metric is one vectorized expression over aligned rows and is NaN where its
+denominator is zero or missing.
+"""
+import numpy as np
+
+# Raw columns the metrics are computed from
+DERIVED_INPUTS = [
+    "sum_requested_prbs", "sum_granted_prbs", "slice_prb", "rx_brate uplink [Mbps]"
+]
+# granted / requested PRBs, granted PRBs / slice allocation, uplink Mbps / granted PRB
+DERIVED_COLUMNS = ["grant_ratio", "prb_utilization", "mbps_per_prb"]
+
+
+def ratio(numerator, denominator):
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    out = np.full(np.broadcast(numerator, denominator).shape, np.nan)
+    np.divide(numerator, denominator, out=out, where=denominator > 0)
+    return out
+
+
+def derive_metrics(columns):
+    """{raw column: array} with every DERIVED_INPUTS column -> {derived column: float64 array}."""
+    requested = columns["sum_requested_prbs"]
+    granted = columns["sum_granted_prbs"]
+    return {
+        "grant_ratio": ratio(granted, requested),
+        "prb_utilization": ratio(granted, columns["slice_prb"]),
+        "mbps_per_prb": ratio(columns["rx_brate uplink [Mbps]"], granted),
+    }
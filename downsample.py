@@ -0,0 +1,130 @@
+# downsample.py
+import numpy as np
+
+
+class MinMaxPyramid:
+    """
+    Multi-resolution min/max decimation of several series on one time axis.
+
+    Level 0 is the raw data. Level L splits the rows into buckets of
+    factor**L rows and keeps, per bucket and per series, the minimum and the
+    maximum sample in time order: two points per bucket, so every peak and
+    dip of the raw line survives at every level. All series have the same
+    number of points at a level, but each keeps the times of its own
+    extremes, so levels store a (points, series) time array.
+
+    query() picks the finest level that fits the requested number of
+    points, so the cost of a zoom depends on the screen width and not on
+    the length of the recording. Each level is built from the one below, so
+    update() accepts a longer copy of the same rows (live data) and only
+    recomputes the last bucket of each level and the new ones.
+    """
+
+    def __init__(self, factor=4):
+        if factor < 2:
+            raise ValueError("factor must be at least 2")
+        self.factor = factor
+        self.t = np.empty(0, dtype=np.int64)
+        self.values = np.empty((0, 0))
+        self.levels = []   # [(t (2 * buckets, k), v (2 * buckets, k))] for L = 1, 2, ...
+
+    def __len__(self):
+        return len(self.t)
+
+    def bucket_size(self, level):
+        return self.factor ** level
+
+    def update(self, times, values):
+        """
+        Adopt `times` (n,) and `values` (n, k). If they extend the rows seen
+        before, only the last incomplete bucket of each level and the new
+        ones are recomputed; otherwise everything is rebuilt.
+        """
+        times = np.asarray(times, dtype=np.int64)
+        values = np.asarray(values)
+        n_old = len(self.t)
+        if len(times) == n_old and values.shape == self.values.shape:
+            return
+        extends = n_old <= len(times) and values.shape[1:] == self.values.shape[1:]
+        self.t, self.values = times, values
+        if not extends:
+            self.levels = []
+            n_old = 0
+
+        level = 1
+        while self.bucket_size(level - 1) < len(times):
+            size = self.bucket_size(level)
+            # Level 1 groups raw rows, every coarser level groups the two
+            # points of `factor` buckets of the level below
+            if level == 1:
+                source_t, source_v, group = self.t, self.values, self.factor
+            else:
+                source_t, source_v = self.levels[level - 2]
+                group = 2 * self.factor
+            if level > len(self.levels):
+                # New coarsest level: built from the level below
+                self.levels.append(self._reduce(source_t, source_v, group, 0))
+            else:
+                first = n_old // size
+                lo_t, lo_v = self.levels[level - 1]
+                new_t, new_v = self._reduce(source_t, source_v, group, first * group)
+                self.levels[level - 1] = (
+                    np.concatenate([lo_t[:2 * first], new_t]),
+                    np.concatenate([lo_v[:2 * first], new_v]),
+                )
+            level += 1
+
+    @staticmethod
+    def _reduce(t, v, group, start):
+        """
+        Min/max points of the groups of `group` rows of (t, v) starting at row
+        `start`. t is (n,) for raw rows or (n, k) for the points of a level;
+        within a group the rows of every series are in time order.
+        """
+        t, v = t[start:], v[start:]
+        buckets = -(-len(v) // group)
+        k = v.shape[1]
+        if buckets == 0:
+            return np.empty((0, k), dtype=np.int64), np.empty((0, k), dtype=v.dtype)
+
+        # Pad the last partial group with NaN so every group reshapes evenly
+        padded = np.full((buckets * group, k), np.nan)
+        padded[:len(v)] = v
+        blocks = padded.reshape(buckets, group, k)
+        nan = np.isnan(blocks)
+        # All-NaN groups pick row 0 and stay NaN, which leaves a gap in the line
+        low = np.argmin(np.where(nan, np.inf, blocks), axis=1)
+        high = np.argmax(np.where(nan, -np.inf, blocks), axis=1)
+        base = (np.arange(buckets) * group)[:, None]
+        first = np.minimum(low, high) + base
+        second = np.maximum(low, high) + base
+
+        rows = np.empty((2 * buckets, k), dtype=np.int64)
+        rows[0::2], rows[1::2] = first, second
+        columns = np.arange(k)[None, :]
+        times = t[rows, columns] if t.ndim == 2 else t[rows]
+        return times, v[rows, columns]
+
+    def query(self, x_start, x_end, max_points):
+        """
+        (x, y) arrays of shape (m, k) covering [x_start, x_end] plus one point
+        on either side, from the finest level with at most max_points points
+        per series (the coarsest level if none is that small).
+        """
+        k = self.values.shape[1] if self.values.ndim == 2 else 0
+        i0 = max(int(np.searchsorted(self.t, x_start, side='left')) - 1, 0)
+        i1 = min(int(np.searchsorted(self.t, x_end, side='right')) + 1, len(self.t))
+        if i1 <= i0:
+            return np.empty((0, k), dtype=np.int64), np.empty((0, k))
+
+        if i1 - i0 <= max_points or not self.levels:
+            x = np.repeat(self.t[i0:i1, None], k, axis=1)
+            return x, self.values[i0:i1]
+
+        for level in range(1, len(self.levels) + 1):
+            size = self.bucket_size(level)
+            b0, b1 = i0 // size, -(-i1 // size)
+            if 2 * (b1 - b0) <= max_points:
+                break
+        t, v = self.levels[level - 1]
+        return t[2 * b0:2 * b1], v[2 * b0:2 * b1]
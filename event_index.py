@@ -0,0 +1,218 @@
+# event_index.py
+"""
+Run-length-encoded event index of the classifier log and the scheduling
+policy.
+
+The xApp logs the same class many times in a row and the scheduling policy
+rarely changes, so both are stored as segments: (start, end, value, count)
+for every run of equal values, where start/end are the epoch-ms times of the
+first and last sample of the run and count is the number of samples.
+database.py writes them to the "events" collection at ingest, get_data keeps
+the classifier log in memory as a SegmentSeries, and EventIndex answers
+"next interference onset / policy switch after t" with a binary search.
+"""
+import numpy as np
+
+# One document per segment: {kind, start, end, value, count}, indexed on (kind, start)
+EVENT_COLLECTION = "events"
+CLASSIFIER_EVENTS = "classifier"
+POLICY_EVENTS = "scheduling_policy"
+
+# EventIndex kinds
+INTERFERENCE_ONSET = "interference"
+POLICY_SWITCH = "policy"
+
+
+def same_as_previous(values):
+    """Boolean array, True where values[i] equals values[i - 1] (NaN equals NaN)."""
+    values = np.asarray(values)
+    same = values[1:] == values[:-1]
+    if values.dtype.kind == 'f':
+        same |= np.isnan(values[1:]) & np.isnan(values[:-1])
+    return np.asarray(same, dtype=bool)
+
+
+def run_length_encode(times, values, weights=None):
+    """
+    Collapse time-sorted samples into runs of equal values. Returns
+    (start, end, run values, counts); counts add up `weights` per run
+    (1 per sample by default).
+    """
+    times = np.asarray(times, dtype=np.int64)
+    values = np.asarray(values)
+    if len(times) == 0:
+        return times, times.copy(), values[:0], np.empty(0, dtype=np.int64)
+    first = np.flatnonzero(np.concatenate([[True], ~same_as_previous(values)]))
+    last = np.append(first[1:] - 1, len(times) - 1)
+    weights = np.ones(len(times), dtype=np.int64) if weights is None else np.asarray(weights, dtype=np.int64)
+    return times[first], times[last], values[first], np.add.reduceat(weights, first)
+
+
+def segment_documents(kind, start, end, values, counts):
+    return [
+        {"kind": kind, "start": s, "end": e, "value": v, "count": c}
+        for s, e, v, c in zip(start.tolist(), end.tolist(), values.tolist(), counts.tolist())
+    ]
+
+
+class SegmentSeries:
+    """
+    A run-length-encoded series: segment i holds value v[i] for the samples
+    from t[i] to end[i] (count[i] of them). It answers the same as-of
+    lookups as get_data.TimeSeries over the original samples, with arrays
+    shorter by the average run length.
+    """
+
+    def __init__(self, start, end, values, counts=None, dtype=object):
+        self.t = np.asarray(start, dtype=np.int64)
+        self.end = np.asarray(end, dtype=np.int64)
+        self.v = np.asarray(values, dtype=dtype)
+        self.count = np.ones(len(self.t), dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+
+    @classmethod
+    def empty(cls, dtype=object):
+        return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=dtype), dtype=dtype)
+
+    @classmethod
+    def from_points(cls, times, values, dtype=object):
+        times = np.asarray(times, dtype=np.int64)
+        values = np.asarray(values, dtype=dtype)
+        if times.size > 1 and np.any(times[1:] < times[:-1]):
+            order = np.argsort(times, kind='stable')
+            times, values = times[order], values[order]
+        return cls(*run_length_encode(times, values), dtype=dtype)
+
+    def __len__(self):
+        return len(self.t)
+
+    @property
+    def entries(self):
+        """Number of samples represented."""
+        return int(self.count.sum())
+
+    def append(self, times, values):
+        """
+        Add samples in place and return how many were dropped. Samples after
+        the last segment extend it or start new ones. Older samples are merged
+        by re-encoding the series from its segment boundaries, which is exact
+        for samples between two segments or with the value of the run they
+        fall in. The times of the samples inside a run are not kept, so a
+        sample with a different value inside a run cannot be placed and is
+        dropped:
+
+        >>> s = SegmentSeries.from_points([7, 98, 112, 147], ['b'] * 4)
+        >>> s.append([56, 150], ['a', 'a'])
+        1
+        >>> [s.at(q) for q in (56, 100, 147, 150)]
+        ['b', 'b', 'b', 'a']
+        """
+        times = np.asarray(times, dtype=np.int64)
+        if times.size == 0:
+            return 0
+        values = np.asarray(values, dtype=self.v.dtype)
+        order = np.argsort(times, kind='stable')
+        times, values = times[order], values[order]
+
+        dropped = 0
+        if len(self.t) and times[0] < self.end[-1]:
+            # Late samples strictly inside a run with another value
+            run = np.searchsorted(self.t, times, side='right') - 1
+            inside = (run >= 0) & (times < self.end[np.maximum(run, 0)])
+            inside[inside] &= ~self._same(values[inside], self.v[run[inside]])
+            dropped = int(inside.sum())
+            times, values = times[~inside], values[~inside]
+            if times.size == 0:
+                return dropped
+
+        if len(self.t) and times[0] < self.end[-1]:
+            # Each segment as two points, its start carrying its count
+            points = np.concatenate([self.t, self.end, times])
+            labels = np.concatenate([self.v, self.v, values])
+            weights = np.concatenate([self.count, np.zeros(len(self.t), dtype=np.int64), np.ones(len(times), dtype=np.int64)])
+            order = np.argsort(points, kind='stable')
+            start, end, v, count = run_length_encode(points[order], labels[order], weights[order])
+            self.t, self.end, self.v, self.count = start, end, v, count
+            return dropped
+
+        start, end, v, count = run_length_encode(times, values)
+        keep = len(self.t)
+        if keep and same_as_previous(np.array([self.v[-1], v[0]], dtype=self.v.dtype))[0]:
+            # The first new run continues the last segment (which may be a read-only memory map)
+            keep -= 1
+            start[0] = self.t[-1]
+            count[0] += self.count[-1]
+        self.t = np.concatenate([self.t[:keep], start])
+        self.end = np.concatenate([self.end[:keep], end])
+        self.v = np.concatenate([self.v[:keep], v])
+        self.count = np.concatenate([self.count[:keep], count])
+        return dropped
+
+    @staticmethod
+    def _same(a, b):
+        """Element-wise equality, NaN equal to NaN."""
+        same = np.asarray(a == b, dtype=bool)
+        if a.dtype.kind == 'f':
+            same |= np.isnan(a) & np.isnan(b)
+        return same
+
+    def asof_indices(self, query_times, tolerance=None):
+        """
+        Segment index for each query time, with TimeSeries.asof_indices
+        semantics over the original samples: inside a segment its own value;
+        between two segments the last one, unless the next one starts within
+        tolerance and closer than the last one ended. -1 if there is none.
+        """
+        query = np.asarray(query_times, dtype=np.int64)
+        prev = np.searchsorted(self.t, query, side='right') - 1
+        if tolerance is None or len(self.t) == 0:
+            return prev
+
+        nxt = np.minimum(prev + 1, len(self.t) - 1)
+        next_gap = self.t[nxt] - query
+        prev_gap = np.where(prev >= 0, query - self.end[np.maximum(prev, 0)], np.iinfo(np.int64).max)
+        use_next = (nxt > prev) & (next_gap <= tolerance) & ((prev_gap > tolerance) | (next_gap < prev_gap))
+        return np.where(use_next, nxt, prev)
+
+    def at(self, t, default=None):
+        """As-of lookup: value of the segment at or before t."""
+        i = int(np.searchsorted(self.t, t, side='right')) - 1
+        return self.v[i] if i >= 0 else default
+
+
+def is_interference(label):
+    return label is not None and "with interference" in str(label)
+
+
+def interference_onsets(segments):
+    """Start times of the classifier segments that begin an interference period."""
+    flags = np.array([is_interference(label) for label in segments.v], dtype=bool)
+    onset = flags & ~np.concatenate([[False], flags[:-1]])
+    return segments.t[onset]
+
+
+class EventIndex:
+    """Sorted event times per kind; every lookup is one binary search."""
+
+    def __init__(self):
+        self.times = {}
+        self.version = 0
+
+    def set(self, kind, times):
+        self.times[kind] = np.sort(np.asarray(times, dtype=np.int64))
+        self.version += 1
+
+    def next_after(self, kind, t):
+        """First event strictly after t, or None."""
+        times = self.times.get(kind)
+        if times is None:
+            return None
+        i = int(np.searchsorted(times, t, side='right'))
+        return int(times[i]) if i < len(times) else None
+
+    def last_at_or_before(self, kind, t):
+        """Last event at or before t, or None."""
+        times = self.times.get(kind)
+        if times is None:
+            return None
+        i = int(np.searchsorted(times, t, side='right')) - 1
+        return int(times[i]) if i >= 0 else None
@@ -1,16 +1,146 @@
 
 from dotenv import load_dotenv
 import os
+import threading
+import time
+import numpy as np
 import pymongo
 import certifi
+from bson import ObjectId
+
+from derived_metrics import DERIVED_COLUMNS, DERIVED_INPUTS, derive_metrics
+from event_index import CLASSIFIER_EVENTS, EVENT_COLLECTION, POLICY_EVENTS, SegmentSeries
+from snapshot import SNAPSHOT_ENABLED, read_snapshot, snapshot_key, write_snapshot
 
 load_dotenv()
 
-def timestamp_to_millis(timestamp_str):
-    hh, mm, ss, mmm = map(int, timestamp_str.split(':'))
-    return (hh * 3600 + mm * 60 + ss) * 1000 + mmm
+# Collections written by `database.py --layout bucketed`
+KPI_BUCKET_COLLECTION = "csv_buckets"
+LOG_BUCKET_COLLECTION = "log_buckets"
+# Written line by line by log_tailer.py
+LOG_ENTRY_COLLECTION = "log_entries"
+# database.py bumps {"_id": SOURCE_VERSION_ID} here on every batch ingest
+STATE_COLLECTION = "ingest_state"
+SOURCE_VERSION_ID = "source_version"
+
+# raw column names that database.py wrote as _id into the csv collection
+RAW_GRAPH_COLUMNS = [
+    "rx_brate uplink [Mbps]","ul_sinr",
+    "sum_requested_prbs","tx_brate downlink [Mbps]",
+    "ul_mcs","sum_granted_prbs"
+]
+SERIES_COLUMNS = RAW_GRAPH_COLUMNS + ['slice_prb', 'scheduling_policy'] + DERIVED_COLUMNS
+
+# Seconds between connection attempts while MongoDB is unreachable
+LOAD_RETRY_INTERVAL = float(os.getenv("ORAN_LOAD_RETRY_S", 2.0))
+
+def env_millis(name):
+    value = os.getenv(name)
+    return int(value) if value else None
+
+def record_millis(records):
+    """
+    int64 epoch ms of column records written by database.py. Records from
+    before the 't' field only have whole seconds in 'unix_epoch'.
+    """
+    times = np.array([record.get('t', -1) for record in records], dtype=np.int64)
+    missing = np.flatnonzero(times < 0)
+    if len(missing):
+        times[missing] = [records[i]['unix_epoch'] * 1000 for i in missing]
+    return times
+
+class TimeSeries:
+    """
+    One series as two contiguous sorted arrays: int64 times and (by default)
+    float64 values. Lookups are binary searches over the time array.
+    """
+
+    def __init__(self, times, values, dtype=np.float64):
+        times = np.asarray(times, dtype=np.int64)
+        values = np.asarray(values, dtype=dtype)
+        if times.size > 1 and np.any(times[1:] < times[:-1]):
+            order = np.argsort(times, kind='stable')
+            times, values = times[order], values[order]
+        self.t = times
+        self.v = values
+
+    @classmethod
+    def empty(cls, dtype=np.float64):
+        return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=dtype), dtype)
+
+    def __len__(self):
+        return len(self.t)
+
+    def window(self, t_start, t_end):
+        """Return (times, values) views with t_start <= t <= t_end."""
+        lo = np.searchsorted(self.t, t_start, side='left')
+        hi = np.searchsorted(self.t, t_end, side='right')
+        return self.t[lo:hi], self.v[lo:hi]
+
+    def at(self, t, default=None):
+        """As-of lookup: value of the last sample at or before t."""
+        i = np.searchsorted(self.t, t, side='right') - 1
+        if i < 0:
+            return default
+        return self.v[i]
+
+    def append(self, times, values):
+        """
+        Append samples to this series. The TimeSeries object stays the same but
+        t and v are replaced by new arrays, so read them through the series
+        rather than keeping the arrays. Out-of-order samples are merged so the
+        arrays stay sorted.
+        """
+        times = np.asarray(times, dtype=np.int64)
+        if times.size == 0:
+            return
+        values = np.asarray(values, dtype=self.v.dtype)
+        in_order = len(self.t) == 0 or times[0] >= self.t[-1]
+        self.t = np.concatenate([self.t, times])
+        self.v = np.concatenate([self.v, values])
+        if not in_order or np.any(times[1:] < times[:-1]):
+            order = np.argsort(self.t, kind='stable')
+            self.t, self.v = self.t[order], self.v[order]
+
+    def asof_indices(self, query_times, tolerance=None):
+        """
+        Vectorized as-of join: for each query time, the index of the last sample
+        at or before it (-1 if there is none). With a tolerance, the nearest
+        sample within +/- tolerance wins, so a sample slightly after the query
+        time can still match.
+        """
+        query = np.asarray(query_times, dtype=np.int64)
+        prev = np.searchsorted(self.t, query, side='right') - 1
+        if tolerance is None or len(self.t) == 0:
+            return prev
+
+        nxt = np.minimum(prev + 1, len(self.t) - 1)
+        next_gap = self.t[nxt] - query
+        prev_gap = np.where(prev >= 0, query - self.t[np.maximum(prev, 0)], np.iinfo(np.int64).max)
+        use_next = (nxt > prev) & (next_gap <= tolerance) & ((prev_gap > tolerance) | (next_gap < prev_gap))
+        return np.where(use_next, nxt, prev)
+
+    def latest(self, n=1):
+        """Return (times, values) views of the last n samples."""
+        if n <= 0:
+            return self.t[:0], self.v[:0]
+        return self.t[-n:], self.v[-n:]
+
 
 class Database:
+    """
+    Process-wide access to the KPI series and the classifier log.
+
+    Creating the instance does no I/O: the series start empty and are loaded
+    by load() / load_async(). load_async() runs the load in a background
+    thread (retrying while MongoDB is unreachable) and sets the `ready` event
+    when the data is in place.
+
+    Decoded series are kept in a local snapshot (snapshot.py) keyed by the
+    state of the source collections; while that state is unchanged a restart
+    memory-maps the snapshot and only fetches log entries added since.
+    """
+
     _instance = None
 
     def __new__(cls, *args, **kwargs):
@@ -18,42 +148,280 @@ class Database:
             cls._instance = super().__new__(cls)
         return cls._instance
     
-    def __init__(self,user_name="SenseORAN",password="SenseORANFeb21",cluster="orancluster.5njsvyr"):
+    def __init__(self,user_name="SenseORAN",password="SenseORANFeb21",cluster="orancluster.5njsvyr",t_start=None,t_end=None):
         if hasattr(self, 'uri'):  # Check if instance already initialized
             return
         
         self.uri = "mongodb://localhost:27017"
+        # MongoClient only connects on the first operation
         self.client = pymongo.MongoClient(self.uri, serverSelectionTimeoutMS=5000)
 
         self.current_timestamp = 0
 
-        self.load_csv()
-        self.load_log_file()
+        # Optional epoch-ms range to load; only honoured by the bucketed layout
+        self.t_start = t_start if t_start is not None else env_millis("ORAN_LOAD_START_MS")
+        self.t_end = t_end if t_end is not None else env_millis("ORAN_LOAD_END_MS")
+        self.use_buckets = None
 
         self.scheduling_policy_map = {
             0:"Round Robin",
             1:"Water Filling",
             2:"Proportionally Fair"
         }
-    
+
+        # Column names are fixed, so views can be built before any data arrives
+        self.graph_columns = [self.format_column_name(c) for c in RAW_GRAPH_COLUMNS]
+        self.set_series({column: TimeSeries.empty() for column in SERIES_COLUMNS})
+        # Classifier log and scheduling policy as run-length-encoded segments
+        self.log_series = SegmentSeries.empty()
+        self.policy_segments = SegmentSeries.empty(dtype=np.float64)
+        self._last_log_entry_id = None
+
+        self.ready = threading.Event()
+        self.load_seconds = None
+        self._loader = None
+        self._loader_lock = threading.Lock()
+
+    def load(self):
+        """Load every series from MongoDB now, in the calling thread."""
+        started = time.perf_counter()
+        # Fail fast (and let load_async retry) instead of loading from a half-reachable server
+        self.client.admin.command("ping")
+        self.use_buckets = self.has_buckets(KPI_BUCKET_COLLECTION)
+
+        key = snapshot_key(self.source_state()) if SNAPSHOT_ENABLED else None
+        if key is not None and self.load_snapshot(key):
+            source = "local snapshot"
+            # log_tailer.py may have appended entries since the snapshot was written;
+            # keep them in the snapshot so the next start does not fetch them again
+            if self.refresh_log() is not None:
+                self.save_snapshot(key)
+        else:
+            source = "MongoDB"
+            self.load_csv()
+            self.load_log_file()
+            if key is not None:
+                self.save_snapshot(key)
+        self.load_seconds = time.perf_counter() - started
+
+        points = sum(len(series) for series in self.series.values())
+        print(f"[Database] loaded {points} KPI points and {self.log_series.entries} log entries "
+              f"({len(self.log_series)} segments) from {source} in {self.load_seconds:.2f} s")
+        self.ready.set()
+
+    def source_state(self):
+        """
+        Cheap description of the source collections: the ingest version
+        written by database.py, document counts, and the newest time and
+        point count of the bucketed collections (which grow by appends).
+        """
+        db = self.client['myDatabase']
+        stamp = db[STATE_COLLECTION].find_one({"_id": SOURCE_VERSION_ID})
+        state = {
+            "version": stamp.get("version") if stamp else None,
+            "use_buckets": self.use_buckets,
+            "t_start": self.t_start,
+            "t_end": self.t_end,
+        }
+        for name in ('csv', 'log', KPI_BUCKET_COLLECTION, LOG_BUCKET_COLLECTION):
+            state[name] = db[name].estimated_document_count()
+        for name in (KPI_BUCKET_COLLECTION, LOG_BUCKET_COLLECTION):
+            totals = list(db[name].aggregate([
+                {"$group": {"_id": None, "t_max": {"$max": "$t_max"}, "points": {"$sum": "$count"}}}
+            ]))
+            state[name + "_totals"] = [totals[0]["t_max"], totals[0]["points"]] if totals else None
+        return state
+
+    def save_snapshot(self, key):
+        last_id = self._last_log_entry_id
+        meta = {"last_log_entry_id": str(last_id) if isinstance(last_id, ObjectId) else None}
+        try:
+            write_snapshot(
+                key,
+                {column: (series.t, series.v) for column, series in self.series.items()},
+                (self.log_series.t, self.log_series.end, self.log_series.v, self.log_series.count), meta,
+            )
+        except OSError as e:
+            print(f"[Database] could not write snapshot: {e}")
+
+    def load_snapshot(self, key):
+        """Install the series of snapshot `key`; False if there is none."""
+        snapshot = read_snapshot(key)
+        if snapshot is None:
+            return False
+        series, log, meta = snapshot
+        if set(series) != set(SERIES_COLUMNS):
+            return False
+
+        self.set_series({column: TimeSeries(*series[column]) for column in SERIES_COLUMNS})
+        policy = self.series['scheduling_policy']
+        known = ~np.isnan(policy.v)
+        self.policy_segments = SegmentSeries.from_points(policy.t[known], policy.v[known], dtype=np.float64)
+        self.log_series = SegmentSeries(*log)
+        last_id = meta.get("last_log_entry_id")
+        self._last_log_entry_id = ObjectId(last_id) if last_id else None
+        return True
+
+    def load_async(self, retry_interval=LOAD_RETRY_INTERVAL):
+        """Start loading in a background thread, once; returns immediately."""
+        with self._loader_lock:
+            if self._loader is not None:
+                return
+            self._loader = threading.Thread(
+                target=self._load_with_retry, args=(retry_interval,), name="database-load", daemon=True
+            )
+            self._loader.start()
+
+    def _load_with_retry(self, retry_interval):
+        while True:
+            try:
+                self.load()
+                return
+            except pymongo.errors.PyMongoError as e:
+                print(f"[Database] MongoDB not available ({e.__class__.__name__}), retrying in {retry_interval}s")
+                time.sleep(retry_interval)
+
+    def wait_ready(self, timeout=None):
+        """Start loading if needed and block until the data is loaded (or timeout)."""
+        self.load_async()
+        return self.ready.wait(timeout)
+
+
+    def has_buckets(self, collection_name):
+        try:
+            return self.client['myDatabase'][collection_name].find_one({}, {"_id": 1}) is not None
+        except Exception:
+            return False
+
+    def load_bucketed_series(self, collection_name, fields, query=None, t_start=None, t_end=None):
+        """
+        Read points from a bucketed collection, touching only the buckets that
+        overlap [t_start, t_end] (epoch ms, either bound may be None).
+        Returns (times, {field: values}) in storage order: a live append with
+        older timestamps leaves its bucket unsorted, so callers sort.
+        """
+        query = dict(query or {})
+        if t_end is not None:
+            query["bucket_start"] = {"$lte": t_end}
+        if t_start is not None:
+            query["t_max"] = {"$gte": t_start}
+
+        projection = {"t": 1, "bucket_start": 1, "t_max": 1, **{field: 1 for field in fields}}
+        cursor = self.client['myDatabase'][collection_name].find(query, projection).sort("bucket_start", 1)
+
+        times = []
+        values = {field: [] for field in fields}
+        for bucket in cursor:
+            bucket_times = bucket.get('t', [])
+            inside = (t_start is None or bucket["bucket_start"] >= t_start) and \
+                (t_end is None or bucket["t_max"] <= t_end)
+            if inside:
+                times.extend(bucket_times)
+                for field in fields:
+                    values[field].extend(bucket.get(field, []))
+                continue
+
+            # Trim the edge buckets to the requested range with a mask, since
+            # their times are not necessarily sorted
+            bucket_array = np.asarray(bucket_times, dtype=np.int64)
+            keep = np.ones(len(bucket_array), dtype=bool)
+            if t_start is not None:
+                keep &= bucket_array >= t_start
+            if t_end is not None:
+                keep &= bucket_array <= t_end
+            kept = np.flatnonzero(keep).tolist()
+            times.extend(bucket_times[i] for i in kept)
+            for field in fields:
+                field_values = bucket.get(field, [])
+                values[field].extend(field_values[i] for i in kept)
+        return times, values
+
+    def load_bucketed_column(self, column_name, t_start=None, t_end=None):
+        """Return (times, values) for one KPI column stored with the bucketed layout."""
+        times, values = self.load_bucketed_series(
+            KPI_BUCKET_COLLECTION, ["v"], {"column": column_name}, t_start, t_end
+        )
+        return times, values["v"]
+
+    def load_events(self, kind, dtype=object):
+        """
+        The segments database.py stored for one kind of event that overlap
+        the load range, or None if there are none (data ingested before the
+        event index existed).
+        """
+        query = {"kind": kind}
+        if self.t_start is not None:
+            query["end"] = {"$gte": self.t_start}
+        if self.t_end is not None:
+            query["start"] = {"$lte": self.t_end}
+        rows = list(self.client['myDatabase'][EVENT_COLLECTION].find(query).sort("start", 1))
+        if not rows:
+            return None
+        values = np.empty(len(rows), dtype=dtype)
+        values[:] = [row.get("value") for row in rows]
+        return SegmentSeries(
+            [row["start"] for row in rows], [row["end"] for row in rows], values,
+            [row.get("count", 1) for row in rows], dtype=dtype,
+        )
 
     def load_log_file(self, db_name='log_file'):
         """
-        Read the 'log' collection from the 'myDatabase' database and build self.log_data.
+        Build self.log_series, the classifier labels as segments keyed by
+        epoch ms, from the event index (or the batch-loaded log if there is
+        none) plus anything log_tailer.py has appended.
+        """
+        self._last_log_entry_id = None
+        self.log_series = self.load_events(CLASSIFIER_EVENTS)
+        if self.log_series is None:
+            self.log_series = SegmentSeries.empty()
+            self.load_log_document()
+        self.refresh_log()
+
+    def refresh_log(self):
+        """
+        Append the log_entries documents inserted since the last call to
+        self.log_series. Returns the earliest new time key, or None if
+        nothing was added.
+        """
+        query = {}
+        if self._last_log_entry_id is not None:
+            query["_id"] = {"$gt": self._last_log_entry_id}
+        try:
+            collection = self.client['myDatabase'][LOG_ENTRY_COLLECTION]
+            rows = list(collection.find(query, {"t": 1, "class": 1}).sort("_id", 1))
+        except Exception as e:
+            print(f"[Database.refresh_log] error: {e}")
+            return None
+        if not rows:
+            return None
+
+        self._last_log_entry_id = rows[-1]["_id"]
+        times = np.array([row["t"] for row in rows], dtype=np.int64)
+        dropped = self.log_series.append(times, [row.get("class") for row in rows])
+        if dropped:
+            print(f"[Database.refresh_log] dropped {dropped} late log entries inside a run of another class")
+        return int(times.min())
+
+    def load_log_document(self):
+        """
+        Read the 'log' collection from the 'myDatabase' database (or the
+        bucketed log) into self.log_series.
         This avoids relying on self.db existing and is defensive about missing documents.
         """
+        if self.has_buckets(LOG_BUCKET_COLLECTION):
+            times, values = self.load_bucketed_series(
+                LOG_BUCKET_COLLECTION, ["class"], t_start=self.t_start, t_end=self.t_end
+            )
+            self.log_series = SegmentSeries.from_points(times, values["class"])
+            return
+
         try:
             # database.py inserted the log document into database "myDatabase", collection "log"
             collection = self.client['myDatabase']['log']
         except Exception:
             # fallback: try to use any existing self.db if present
-            try:
-                collection = getattr(self, 'db', None)
-                if collection is None:
-                    self.log_data = {}
-                    return
-            except Exception:
-                self.log_data = {}
+            collection = getattr(self, 'db', None)
+            if collection is None:
                 return
 
         # Prefer to find the document with _id == "log_file" (this is how database.py stored it)
@@ -63,61 +431,37 @@ class Database:
             row = collection.find_one()
 
         if not row or 'entries' not in row:
-            self.log_data = {}
             return
 
-        # Now build sorted data and the mapping
-        try:
-            data = sorted(row['entries'], key=lambda x: x.get('unix_epoch', 0))
-        except Exception:
-            # If sorting fails, fallback to the list as-is
-            data = row.get('entries', [])
-
-        self.log_data = {}
-        for record in data:
-            try:
-                # readable_timestamp is like "YYYY-MM-DD HH:MM:SS:MMM" — we use the time part
-                time_part = record.get('readable_timestamp', '').split(' ')[1]
-                timestamp = timestamp_to_millis(time_part)
-                self.log_data[timestamp] = record.get('class')
-            except Exception:
-                # skip malformed entries
-                continue
-            
+        entries = [record for record in row['entries'] if 't' in record or 'timestamp' in record]
+        if all('t' in record for record in entries):
+            times = np.array([record['t'] for record in entries], dtype=np.int64)
+        else:
+            # Ingested before entries carried 't': the parsed wall clock comes back as a naive UTC datetime
+            times = np.array([record['timestamp'] for record in entries], dtype='datetime64[ms]').astype(np.int64)
+        labels = np.empty(len(entries), dtype=object)
+        labels[:] = [record.get('class') for record in entries]
+        self.log_series = SegmentSeries.from_points(times, labels)
 
-    def load_other_csv_columns(self, db_collection, column_name):
+    def load_column(self, column_name, collection=None):
         """
-        Read single-column documents stored in the 'csv' collection inside the 'myDatabase' DB.
-        db_collection can be ignored (kept for compatibility); we will explicitly open the collection.
-        Returns a dict mapping timestamp_ms -> value.
+        Read one column written by database.py (either storage layout) and return
+        it as a TimeSeries keyed by epoch milliseconds.
         """
-        output_dic = {}
+        if self.use_buckets:
+            times, values = self.load_bucketed_column(column_name, self.t_start, self.t_end)
+            return TimeSeries(times, values)
 
-        # The original populater used database 'myDatabase' and collection 'csv'
-        # so explicitly point there:
-        try:
-            collection = self.client['myDatabase']['csv']
-        except Exception:
-            # fallback to whatever self.db is if present
-            try:
-                collection = self.db
-            except Exception:
-                return output_dic
+        if collection is None:
+            return TimeSeries.empty()
 
         row = collection.find_one({"_id": column_name})
         if not row or 'data' not in row:
-            return output_dic
+            return TimeSeries.empty()
 
-        data = sorted(row['data'], key=lambda x: x['unix_epoch'])
-        for record in data:
-            try:
-                timestamp = timestamp_to_millis(record['readable_timestamp'].split(' ')[1])
-            except Exception:
-                # skip malformed record
-                continue
-            output_dic[timestamp] = record.get('value')
-
-        return output_dic
+        records = [record for record in row['data'] if 't' in record or 'unix_epoch' in record]
+        # TimeSeries sorts the times itself if they are out of order
+        return TimeSeries(record_millis(records), [record.get('value') for record in records])
 
     def format_column_name(self,column_name):
         column_name = column_name.replace('sum_','').replace(' [Mbps]','').replace('_',' ')
@@ -141,8 +485,8 @@ class Database:
 
     def load_csv(self, db_name='csv'):
         """
-        Load graph columns from the 'csv' collection inside the 'myDatabase' DB.
-        Builds self.graph_x_values and self.graph_y_values keyed by formatted names.
+        Load graph columns from the 'csv' collection inside the 'myDatabase' DB
+        and install them with set_series().
         """
         # Use the same DB/collection structure that database.py used:
         collection = None
@@ -155,65 +499,90 @@ class Database:
             except Exception:
                 collection = None
 
-        # raw column names that database.py wrote as _id into the csv collection
-        raw_graph_columns = [
-            "rx_brate uplink [Mbps]","ul_sinr",
-            "sum_requested_prbs","tx_brate downlink [Mbps]",
-            "ul_mcs","sum_granted_prbs"
-        ]
+        series = {column_name: self.load_column(column_name, collection) for column_name in SERIES_COLUMNS}
+        self.derive_missing(series)
+        self.set_series(series)
+
+        # Policy changes from the event index; samples newer than it (live
+        # appends) are encoded here
+        policy = series['scheduling_policy']
+        segments = self.load_events(POLICY_EVENTS, dtype=np.float64)
+        if segments is None:
+            segments = SegmentSeries.empty(dtype=np.float64)
+        newer = ~np.isnan(policy.v)
+        if len(segments):
+            newer &= policy.t > segments.end[-1]
+        segments.append(policy.t[newer], policy.v[newer])
+        self.policy_segments = segments
+
+    def append_points(self, column, times, values):
+        """Append live samples to one series (and to the policy segments)."""
+        self.series[column].append(times, values)
+        if column == 'scheduling_policy':
+            values = np.asarray(values, dtype=np.float64)
+            known = ~np.isnan(values)
+            self.policy_segments.append(np.asarray(times)[known], values[known])
+
+    def derive_missing(self, series):
+        """
+        Fill derived columns that were not stored (data ingested before
+        database.py wrote them) from the raw series, on the timeline of the
+        first input. All inputs come from the same spreadsheet rows, so the
+        as-of join matches row for row.
+        """
+        missing = [column for column in DERIVED_COLUMNS if not len(series[column])]
+        if not missing:
+            return
+        times = series[DERIVED_INPUTS[0]].t
+        aligned = {}
+        for column in DERIVED_INPUTS:
+            index = series[column].asof_indices(times)
+            values = np.full(len(times), np.nan)
+            found = index >= 0
+            values[found] = series[column].v[index[found]]
+            aligned[column] = values
+        derived = derive_metrics(aligned)
+        for column in missing:
+            series[column] = TimeSeries(times, derived[column])
+
+    def set_series(self, series):
+        """
+        Install a {raw column name: TimeSeries} dict. Formatted names resolve
+        through column_aliases.
+        """
+        self.series = series
+        self.column_aliases = {self.format_column_name(c): c for c in RAW_GRAPH_COLUMNS}
+        self.rbs_assigned = series['slice_prb']
+        self.scheduling_policy = series['scheduling_policy']
+
+    def get_series(self, column):
+        """Look a series up by raw (e.g. 'ul_sinr') or formatted (e.g. 'UL SINR') name."""
+        return self.series[self.column_aliases.get(column, column)]
 
-        self.graph_x_values = {}
-        self.graph_y_values = {}
+    def window(self, column, t_start, t_end):
+        return self.get_series(column).window(t_start, t_end)
+
+    def at(self, column, t, default=None):
+        return self.get_series(column).at(t, default)
+
+    def latest(self, column, n=1):
+        return self.get_series(column).latest(n)
 
-        if collection is None:
-            # Can't find the collection; create empty structures for all columns
-            for column_name in raw_graph_columns:
-                formatted = self.format_column_name(column_name)
-                self.graph_x_values[formatted] = []
-                self.graph_y_values[formatted] = []
-        else:
-            for column_name in raw_graph_columns:
-                row = collection.find_one({"_id": column_name})
-                formatted_name = self.format_column_name(column_name)
-                if not row or 'data' not in row:
-                    # no data for this column
-                    self.graph_x_values[formatted_name] = []
-                    self.graph_y_values[formatted_name] = []
-                    continue
-
-                data = sorted(row['data'], key=lambda x: x['unix_epoch'])
-                x_list = []
-                y_list = []
-                for ts_rec in data:
-                    try:
-                        x_list.append(timestamp_to_millis(ts_rec['readable_timestamp'].split(' ')[1]))
-                        y_list.append(ts_rec.get('value'))
-                    except Exception:
-                        # skip malformed entries
-                        continue
-
-                self.graph_x_values[formatted_name] = x_list
-                self.graph_y_values[formatted_name] = y_list
-
-        # Load other simple columns (slice_prb, scheduling_policy) from the same collection
-        self.rbs_assigned = self.load_other_csv_columns(collection, 'slice_prb')
-        self.scheduling_policy = self.load_other_csv_columns(collection, 'scheduling_policy')
-
-        # update list of graph column names (formatted)
-        self.graph_columns = [self.format_column_name(c) for c in raw_graph_columns]
-        
     def map_scheduling_policy(self,policy):
-        if policy == "":
+        if policy is None or policy == "" or policy != policy:
             return
 
         
-        return self.scheduling_policy_map[policy]
+        return self.scheduling_policy_map[int(policy)]
         
 
 
 
     def get_graph_values(self):
-        return self.graph_x_values,self.graph_y_values
+        # Built on every call: live appends replace the series arrays
+        graph_x_values = {name: self.get_series(name).t for name in self.graph_columns}
+        graph_y_values = {name: self.get_series(name).v for name in self.graph_columns}
+        return graph_x_values,graph_y_values
 
     def get_graph_columns(self):
         return self.graph_columns
@@ -0,0 +1,170 @@
+# live_feed.py
+"""
+Push new MongoDB records to the dashboard without reloading.
+
+One background thread per process watches the bucketed KPI collection and
+the log_entries collection written by log_tailer.py. On a replica set it uses
+a change stream; a standalone mongod does not support those, so the thread
+falls back to polling the newest buckets/entries. New points are put into
+in-memory ring buffers that the playback clock drains on the IOLoop, so no
+view ever queries Mongo itself.
+"""
+import os
+import threading
+
+import numpy as np
+from pymongo.errors import OperationFailure, PyMongoError
+
+from get_data import KPI_BUCKET_COLLECTION, LOG_ENTRY_COLLECTION
+from ring_buffer import RingBuffer
+
+LIVE_BUFFER_CAPACITY = int(os.getenv("LIVE_BUFFER_CAPACITY", 10000))
+LIVE_POLL_INTERVAL = float(os.getenv("LIVE_POLL_INTERVAL", 0.5))
+
+LOG_STREAM = "log"
+
+
+class LiveFeed:
+    """
+    Background watcher that fills one RingBuffer per stream: each KPI column
+    gets int64 epoch-ms times and float64 values, the classifier log int64
+    times and class labels. Buffers are bounded; if nobody drains them the
+    oldest records are dropped.
+    """
+
+    def __init__(self, client, columns, capacity=LIVE_BUFFER_CAPACITY, poll_interval=LIVE_POLL_INTERVAL,
+                 last_t=None, last_log_id=None):
+        self.db = client['myDatabase']
+        self.columns = list(columns)
+        self.poll_interval = poll_interval
+        self.buffers = {
+            column: RingBuffer(capacity, {"t": np.int64, "v": np.float64}) for column in self.columns
+        }
+        self.buffers[LOG_STREAM] = RingBuffer(capacity, {"t": np.int64, "v": object})
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Watermarks: newest point already seen per column, newest log entry _id.
+        # Seeded from what the Database loaded, so nothing written since is skipped.
+        self.last_t = {column: (last_t or {}).get(column) for column in self.columns}
+        self.last_log_id = last_log_id
+        self.mode = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name="live-feed", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def drain(self, name):
+        """Remove and return (times, values) arrays of everything buffered for one stream."""
+        with self._lock:
+            unread = self.buffers[name].pop_unread()
+        return unread["t"], unread["v"]
+
+    def _push(self, name, times, values):
+        if len(times):
+            with self._lock:
+                self.buffers[name].extend({"t": times, "v": values})
+
+    # ---------------- watermarks ---------------------------------------------
+    def init_watermarks(self):
+        """
+        Fill the watermarks nobody seeded from what is already stored, so only
+        new records are pushed. Existing watermarks are kept (also across
+        retries), so records written in the meantime are caught up, not dropped.
+        """
+        buckets = self.db[KPI_BUCKET_COLLECTION]
+        for column in self.columns:
+            if self.last_t[column] is None:
+                newest = buckets.find_one({"column": column}, {"t_max": 1}, sort=[("bucket_start", -1)])
+                self.last_t[column] = newest["t_max"] if newest else None
+        if self.last_log_id is None:
+            newest_entry = self.db[LOG_ENTRY_COLLECTION].find_one({}, {"_id": 1}, sort=[("_id", -1)])
+            self.last_log_id = newest_entry["_id"] if newest_entry else None
+
+    # ---------------- record handling ----------------------------------------
+    def handle_bucket(self, bucket):
+        column = bucket.get("column")
+        if column not in self.last_t:
+            return
+        times = np.asarray(bucket.get("t", []), dtype=np.int64)
+        values = np.asarray(bucket.get("v", []), dtype=np.float64)
+        if self.last_t[column] is not None:
+            new = times > self.last_t[column]
+            times, values = times[new], values[new]
+        if len(times):
+            self.last_t[column] = int(times.max())
+            self._push(column, times, values)
+
+    def handle_log_entry(self, entry):
+        if self.last_log_id is not None and entry["_id"] <= self.last_log_id:
+            return
+        self.last_log_id = entry["_id"]
+        label = np.empty(1, dtype=object)
+        label[0] = entry.get("class")
+        self._push(LOG_STREAM, np.array([entry["t"]], dtype=np.int64), label)
+
+    # ---------------- watching -----------------------------------------------
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                self.init_watermarks()
+                try:
+                    self.watch_change_stream()
+                except OperationFailure as e:
+                    # Standalone mongod: change streams need a replica set
+                    print(f"[LiveFeed] change streams unavailable ({e.code}), polling every {self.poll_interval}s")
+                    self.poll()
+            except PyMongoError as e:
+                print(f"[LiveFeed] error: {e}; retrying")
+                self._stop.wait(max(self.poll_interval, 1.0))
+
+    def watch_change_stream(self):
+        pipeline = [{"$match": {
+            "ns.coll": {"$in": [KPI_BUCKET_COLLECTION, LOG_ENTRY_COLLECTION]},
+            "operationType": {"$in": ["insert", "update", "replace"]},
+        }}]
+        with self.db.watch(pipeline, full_document="updateLookup") as stream:
+            self.mode = "change_stream"
+            # The stream only reports changes from now on: pick up whatever was
+            # written since the watermarks (load, outage) first. Records seen
+            # twice are filtered by the watermarks.
+            self.poll_once()
+            while not self._stop.is_set():
+                change = stream.try_next()
+                if change is None:
+                    self._stop.wait(0.05)
+                    continue
+                document = change.get("fullDocument")
+                if not document:
+                    continue
+                if change["ns"]["coll"] == KPI_BUCKET_COLLECTION:
+                    self.handle_bucket(document)
+                else:
+                    self.handle_log_entry(document)
+
+    def poll_once(self):
+        """Push every bucket point and log entry newer than the watermarks."""
+        buckets = self.db[KPI_BUCKET_COLLECTION]
+        entries = self.db[LOG_ENTRY_COLLECTION]
+        for column in self.columns:
+            query = {"column": column}
+            if self.last_t[column] is not None:
+                # Only the bucket holding the watermark and newer ones
+                query["t_max"] = {"$gt": self.last_t[column]}
+            for bucket in buckets.find(query).sort("bucket_start", 1):
+                self.handle_bucket(bucket)
+
+        query = {"_id": {"$gt": self.last_log_id}} if self.last_log_id is not None else {}
+        for entry in entries.find(query, {"t": 1, "class": 1}).sort("_id", 1):
+            self.handle_log_entry(entry)
+
+    def poll(self):
+        self.mode = "polling"
+        while not self._stop.is_set():
+            self.poll_once()
+            self._stop.wait(self.poll_interval)
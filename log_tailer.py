@@ -0,0 +1,212 @@
+# log_tailer.py
+"""
+Follow data/xapp-logger.log while the xApp writes it and append new classifier
+entries to MongoDB (collection "log_entries", one document per line).
+
+The byte offset and inode of the file are kept in the "ingest_state"
+collection, so a restarted tailer continues where it stopped. Rotation (new
+inode) and truncation (file shorter than the offset) restart from the top of
+the new file. Usage:
+
+    python log_tailer.py [--log data/xapp-logger.log] [--flush-interval 0.5]
+"""
+from dotenv import load_dotenv
+import argparse
+import calendar
+import os
+import re
+import time
+from datetime import datetime
+
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from database import LOG_FILE_PATH, STATE_COLLECTION, get_database
+
+load_dotenv()
+
+LOG_ENTRY_COLLECTION = "log_entries"
+DUPLICATE_KEY = 11000
+
+# "2024-02-10 18:38:46,671 INFO     cntrl": the class keeps everything after the
+# level and its separating space, exactly like database.parse_log_file()
+LOG_LINE_RE = re.compile(
+    r"^(\d{4})-(\d{2})-(\d{2}) (\d{2}):(\d{2}):(\d{2}),(\d{3}) (\S+) (.*)$"
+)
+
+
+def parse_log_line(line):
+    """Return a log_entries document for one line, or None if it does not match."""
+    match = LOG_LINE_RE.match(line)
+    if match is None:
+        return None
+    year, month, day, hour, minute, second, millis = map(int, match.groups()[:7])
+    timestamp = datetime(year, month, day, hour, minute, second, millis * 1000)
+    # The log wall clock is treated as UTC, as in database.log_entry_millis()
+    epoch_ms = calendar.timegm((year, month, day, hour, minute, second)) * 1000 + millis
+    return {
+        "timestamp": timestamp,
+        "unix_epoch_timestamp": epoch_ms // 1000,
+        "t": epoch_ms,
+        "class": match.group(9),
+    }
+
+
+class LogTailer:
+    def __init__(self, db, path=LOG_FILE_PATH, flush_interval=0.5, batch_size=1000, max_read=4 * 1024 * 1024):
+        self.path = path
+        self.max_read = max_read
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.entries = db[LOG_ENTRY_COLLECTION]
+        self.state = db[STATE_COLLECTION]
+        self.entries.create_index([("t", ASCENDING)])
+
+        saved = self.state.find_one({"_id": os.path.abspath(path)}) or {}
+        self.offset = saved.get("offset", 0)
+        self.inode = saved.get("inode")
+        self.saved = (self.offset, self.inode)
+        # Kept open so a rotated file can still be read to its end
+        self.file = None
+        self.pending = []
+        self.last_flush = time.monotonic()
+
+    def save_state(self):
+        self.state.replace_one(
+            {"_id": os.path.abspath(self.path)},
+            {"offset": self.offset, "inode": self.inode},
+            upsert=True,
+        )
+        self.saved = (self.offset, self.inode)
+
+    def open_log(self):
+        """Open the log file, continuing from the saved offset if it is the same file."""
+        try:
+            log_file = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+        inode = os.fstat(log_file.fileno()).st_ino
+        if self.inode is not None and inode != self.inode:
+            print(f"{self.path} was rotated while not tailing, reading the new file from the start")
+            self.offset = 0
+        self.file, self.inode = log_file, inode
+        return True
+
+    def check_rotation(self):
+        """
+        Switch to a new file at the same path (rotation) or restart a
+        truncated one. Only called once the open file is read to EOF, so the
+        lines written to the old file before the rotation are not lost.
+        """
+        if os.fstat(self.file.fileno()).st_size < self.offset:
+            print(f"{self.path} was truncated, reading from the start")
+            self.offset = 0
+            return True
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return False
+        if inode == self.inode:
+            return False
+        # The old file is done: a last line without a newline is complete too
+        self.file.seek(self.offset)
+        self.parse_lines(self.file.read())
+        self.file.close()
+        self.file = None
+        self.inode = None
+        self.offset = 0
+        print(f"{self.path} was rotated, reading the new file from the start")
+        return self.open_log()
+
+    def parse_lines(self, data):
+        for line in data.decode("utf-8", errors="replace").splitlines():
+            entry = parse_log_line(line.rstrip("\r"))
+            if entry is not None:
+                self.pending.append(entry)
+
+    def read_chunk(self):
+        """Read complete lines from the open file; returns the number of bytes consumed."""
+        self.file.seek(self.offset)
+        chunk = self.file.read(self.max_read)
+        # Leave a partially written last line for the next read
+        end = chunk.rfind(b"\n") + 1
+        if end == 0:
+            return 0
+        self.offset += end
+        self.parse_lines(chunk[:end])
+        return end
+
+    def read_new_lines(self):
+        if self.file is None and not self.open_log():
+            return
+        if self.read_chunk():
+            # Keep reading this file until it is exhausted before looking for a new one
+            return
+        if self.check_rotation():
+            self.read_chunk()
+
+    def flush(self):
+        """
+        Insert the pending entries and save the offset. On a MongoDB error the
+        entries that were not stored stay pending, so calling it again retries.
+        """
+        if self.pending:
+            count = len(self.pending)
+            try:
+                self.entries.insert_many(self.pending, ordered=False)
+            except BulkWriteError as e:
+                # Every entry without an error was stored, and so was every
+                # duplicate key: stored by an earlier attempt whose reply was
+                # lost (the _id is assigned client-side). Keep only the rest.
+                failed = sorted({
+                    error["index"] for error in e.details.get("writeErrors", [])
+                    if error.get("code") != DUPLICATE_KEY
+                })
+                self.pending = [self.pending[i] for i in failed]
+                if self.pending:
+                    raise
+            print(f"Appended {count} log entries")
+            self.pending = []
+        self.save_state()
+        self.last_flush = time.monotonic()
+
+    def run(self, poll_interval=0.1, retry_interval=1.0):
+        print(f"Tailing {self.path} from byte {self.offset}")
+        try:
+            while True:
+                # While MongoDB is down, stop reading once a full batch is waiting
+                if len(self.pending) < self.batch_size:
+                    self.read_new_lines()
+                due = time.monotonic() - self.last_flush >= self.flush_interval
+                unsaved = self.pending or (self.offset, self.inode) != self.saved
+                if len(self.pending) >= self.batch_size or (due and unsaved):
+                    try:
+                        self.flush()
+                    except PyMongoError as e:
+                        print(f"[LogTailer] MongoDB error ({e.__class__.__name__}), retrying in {retry_interval}s")
+                        time.sleep(retry_interval)
+                        continue
+                time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            self.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tail the xApp log into MongoDB.")
+    parser.add_argument("--log", default=LOG_FILE_PATH, help="path to the xApp log file")
+    parser.add_argument("--flush-interval", type=float, default=0.5,
+                        help="seconds between insert_many batches (default 0.5)")
+    parser.add_argument("--batch-size", type=int, default=1000,
+                        help="flush early once this many entries are pending")
+    parser.add_argument("--from-start", action="store_true",
+                        help="ignore the saved offset and read the whole file")
+    args = parser.parse_args(argv)
+
+    tailer = LogTailer(get_database(), args.log, args.flush_interval, args.batch_size)
+    if args.from_start:
+        tailer.offset = 0
+    tailer.run()
+
+
+if __name__ == "__main__":
+    main()
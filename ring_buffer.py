@@ -0,0 +1,80 @@
+# ring_buffer.py
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Fixed-capacity buffer of aligned NumPy columns.
+
+    Storage is preallocated once. Every item is written twice, at slot p and
+    p + capacity, so the newest n items are always one contiguous slice and
+    window() can return views instead of copies. `head` counts items ever
+    written and `tail` is the read position used by pop_unread(); when a
+    reader falls more than `capacity` items behind, the oldest are dropped.
+    """
+
+    def __init__(self, capacity, dtypes, fill=None):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.dtypes = dict(dtypes)
+        self.fill = dict(fill or {})
+        self._data = {}
+        for name, dtype in self.dtypes.items():
+            self._data[name] = np.full(2 * capacity, self.fill.get(name, 0), dtype=dtype)
+        self.head = 0
+        self.tail = 0
+        self.dropped = 0
+
+    def clear(self):
+        """Forget every item; the storage is refilled in place, so views stay valid."""
+        for name, data in self._data.items():
+            data[:] = self.fill.get(name, 0)
+        self.head = 0
+        self.tail = 0
+
+    def __len__(self):
+        return min(self.head, self.capacity)
+
+    def extend(self, columns):
+        """Append equally long arrays, one per column."""
+        columns = {name: np.asarray(values) for name, values in columns.items()}
+        n = len(next(iter(columns.values())))
+        if n == 0:
+            return
+        if n > self.capacity:
+            # Only the newest `capacity` items can be kept
+            columns = {name: values[-self.capacity:] for name, values in columns.items()}
+            self.head += n - self.capacity
+            n = self.capacity
+
+        slots = (self.head + np.arange(n)) % self.capacity
+        for name, values in columns.items():
+            data = self._data[name]
+            data[slots] = values
+            data[slots + self.capacity] = values
+        self.head += n
+
+        if self.head - self.tail > self.capacity:
+            self.dropped += self.head - self.tail - self.capacity
+            self.tail = self.head - self.capacity
+
+    def append(self, **values):
+        self.extend({name: [value] for name, value in values.items()})
+
+    def window(self, n=None, pad=False):
+        """
+        Views of the newest n items, oldest first. With pad=True the window
+        is always n long and slots never written keep their fill value.
+        """
+        n = self.capacity if n is None else min(n, self.capacity)
+        if not pad:
+            n = min(n, len(self))
+        end = self.head % self.capacity + self.capacity
+        return {name: data[end - n:end] for name, data in self._data.items()}
+
+    def pop_unread(self):
+        """Copies of everything written since the last call; advances the tail."""
+        n = self.head - self.tail
+        self.tail = self.head
+        return {name: view.copy() for name, view in self.window(n).items()}
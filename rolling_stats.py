@@ -0,0 +1,187 @@
+# rolling_stats.py
+"""
+Rolling statistics that are updated one sample at a time.
+
+Every structure here does O(1) (amortized) work per new sample, so the
+dashboard can keep them current on every playback tick without rescanning
+the window: a running sum for the mean, monotonic deques for the minimum
+and maximum, a fixed-width histogram for quantiles and a single state value
+for exponentially weighted moving averages.
+"""
+import math
+from collections import deque
+
+
+class RollingWindow:
+    """The last `size` samples with their running sum, minimum and maximum."""
+
+    def __init__(self, size):
+        if size <= 0:
+            raise ValueError("size must be positive")
+        self.size = size
+        self.values = deque()
+        self.total = 0.0
+        self.pushed = 0
+        # (sample number, value) pairs, values increasing / decreasing from the left
+        self._min = deque()
+        self._max = deque()
+
+    def __len__(self):
+        return len(self.values)
+
+    def push(self, value):
+        """Add one sample; returns the sample that fell out of the window, or None."""
+        number = self.pushed
+        self.pushed += 1
+        self.values.append(value)
+        self.total += value
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((number, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((number, value))
+
+        if len(self.values) <= self.size:
+            return None
+        evicted = self.values.popleft()
+        self.total -= evicted
+        oldest = number - self.size + 1
+        if self._min[0][0] < oldest:
+            self._min.popleft()
+        if self._max[0][0] < oldest:
+            self._max.popleft()
+        return evicted
+
+    @property
+    def mean(self):
+        return self.total / len(self.values) if self.values else math.nan
+
+    @property
+    def min(self):
+        return self._min[0][1] if self._min else math.nan
+
+    @property
+    def max(self):
+        return self._max[0][1] if self._max else math.nan
+
+
+class HistogramQuantiles:
+    """
+    Quantile sketch of a multiset that supports removals: samples are counted
+    in bins of `bin_width`, and quantiles are read back as bin centres, so
+    the error is at most half a bin. Adding and removing are O(1); a query
+    walks the occupied bins, of which a sliding window has few.
+    """
+
+    def __init__(self, bin_width):
+        if bin_width <= 0:
+            raise ValueError("bin_width must be positive")
+        self.bin_width = bin_width
+        self.counts = {}
+        self.n = 0
+
+    def _bin(self, value):
+        return math.floor(value / self.bin_width)
+
+    def add(self, value):
+        key = self._bin(value)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.n += 1
+
+    def remove(self, value):
+        key = self._bin(value)
+        count = self.counts.get(key, 0)
+        if count <= 1:
+            self.counts.pop(key, None)
+        else:
+            self.counts[key] = count - 1
+        self.n -= min(count, 1)
+
+    def quantile(self, q):
+        if not self.n:
+            return math.nan
+        # Nearest rank, the same convention as numpy's method='inverted_cdf'
+        rank = max(math.ceil(q * self.n), 1)
+        seen = 0
+        for key in sorted(self.counts):
+            seen += self.counts[key]
+            if seen >= rank:
+                return (key + 0.5) * self.bin_width
+        return math.nan
+
+
+class Ewma:
+    """Exponentially weighted moving average with the given half-life in samples."""
+
+    def __init__(self, halflife):
+        if halflife <= 0:
+            raise ValueError("halflife must be positive")
+        self.alpha = 1.0 - 0.5 ** (1.0 / halflife)
+        self.value = math.nan
+
+    def push(self, value):
+        if math.isnan(self.value):
+            self.value = value
+        else:
+            self.value += self.alpha * (value - self.value)
+        return self.value
+
+
+class KpiStatistics:
+    """
+    Rolling statistics for a fixed set of KPI columns, fed one row per frame.
+
+    Each column keeps a RollingWindow (mean, min, max over the last `window`
+    samples) and an Ewma; columns listed in `quantile_columns` also keep a
+    HistogramQuantiles over the same window. NaN values (no sample for that
+    frame) are skipped.
+    """
+
+    def __init__(self, columns, window, quantile_columns=(), quantile_bin=0.1, ewma_halflife=20):
+        self.columns = list(columns)
+        self.window = window
+        self.ewma_halflife = ewma_halflife
+        self.quantile_columns = list(quantile_columns)
+        self.quantile_bin = quantile_bin
+        self.reset()
+
+    def reset(self):
+        """Start over with no samples (e.g. after the replay jumped back)."""
+        self.windows = {col: RollingWindow(self.window) for col in self.columns}
+        self.ewmas = {col: Ewma(self.ewma_halflife) for col in self.columns}
+        self.quantiles = {col: HistogramQuantiles(self.quantile_bin) for col in self.quantile_columns}
+
+    @property
+    def memory(self):
+        """Frames after which older history no longer shows in any statistic (EWMA weight < 0.1%)."""
+        return max(self.window, math.ceil(10 * self.ewma_halflife))
+
+    def push(self, row):
+        """Add one frame; `row` holds one value per column in self.columns order."""
+        for col, value in zip(self.columns, row):
+            value = float(value)
+            if math.isnan(value):
+                continue
+            evicted = self.windows[col].push(value)
+            self.ewmas[col].push(value)
+            sketch = self.quantiles.get(col)
+            if sketch is not None:
+                sketch.add(value)
+                if evicted is not None:
+                    sketch.remove(evicted)
+
+    def mean(self, col):
+        return self.windows[col].mean
+
+    def min(self, col):
+        return self.windows[col].min
+
+    def max(self, col):
+        return self.windows[col].max
+
+    def quantile(self, col, q):
+        return self.quantiles[col].quantile(q)
+
+    def ewma(self, col):
+        return self.ewmas[col].value
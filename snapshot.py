@@ -0,0 +1,105 @@
+# snapshot.py
+"""
+Local on-disk copy of the series get_data.Database decodes from MongoDB.
+
+A snapshot is a directory of .npy files (int64 times and float64 values per
+KPI column, the run-length-encoded classifier log as int64 segment start
+and end times and counts plus int32 codes into a label table) and a
+meta.json. It is named after a key describing the state of the source
+collections, so a snapshot is only ever read back for unchanged data; reads
+memory-map the arrays instead of copying them. Writes go to a temporary
+directory that is renamed into place, and older snapshots are removed.
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+SNAPSHOT_DIR = os.getenv("ORAN_SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", ".snapshot"))
+# ORAN_SNAPSHOT=0 always loads from MongoDB
+SNAPSHOT_ENABLED = os.getenv("ORAN_SNAPSHOT", "1") == "1"
+
+# Bump when the on-disk layout or the meaning of the keys changes
+SNAPSHOT_FORMAT = 3
+
+
+def snapshot_key(source_state):
+    """Stable short hash of a JSON-serializable description of the source data."""
+    encoded = json.dumps({"format": SNAPSHOT_FORMAT, **source_state}, sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+def write_snapshot(key, series, log, meta, directory=SNAPSHOT_DIR):
+    """
+    Store {column: (times, values)} and the log segments
+    (start, end, labels, counts). `meta` must be JSON serializable and comes
+    back unchanged from read_snapshot().
+    """
+    os.makedirs(directory, exist_ok=True)
+    target = os.path.join(directory, key)
+    tmp = target + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    columns = list(series)
+    for i, column in enumerate(columns):
+        times, values = series[column]
+        np.save(os.path.join(tmp, f"series_{i}_t.npy"), np.asarray(times, dtype=np.int64))
+        np.save(os.path.join(tmp, f"series_{i}_v.npy"), np.asarray(values, dtype=np.float64))
+
+    log_start, log_end, log_labels, log_counts = log
+    # Few distinct classes: store codes into a small label table instead of objects
+    labels = np.asarray(["" if label is None else str(label) for label in log_labels], dtype=str)
+    table, codes = np.unique(labels, return_inverse=True) if len(labels) else (np.empty(0, dtype=str), labels)
+    missing = np.array([label is None for label in log_labels], dtype=bool)
+    codes = np.where(missing, -1, codes).astype(np.int32)
+    np.save(os.path.join(tmp, "log_t.npy"), np.asarray(log_start, dtype=np.int64))
+    np.save(os.path.join(tmp, "log_end.npy"), np.asarray(log_end, dtype=np.int64))
+    np.save(os.path.join(tmp, "log_count.npy"), np.asarray(log_counts, dtype=np.int64))
+    np.save(os.path.join(tmp, "log_codes.npy"), codes)
+    np.save(os.path.join(tmp, "log_labels.npy"), table)
+
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({"key": key, "columns": columns, "meta": meta}, f)
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+    for name in os.listdir(directory):
+        if name != key:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+def read_snapshot(key, directory=SNAPSHOT_DIR):
+    """
+    Return (series, log, meta) for `key`, or None when no such snapshot
+    exists; log is (start, end, labels, counts). Series and log times are
+    read-only memory maps; labels is an object array (None where the class
+    was missing).
+    """
+    path = os.path.join(directory, key)
+    try:
+        with open(os.path.join(path, "meta.json")) as f:
+            info = json.load(f)
+        if info.get("key") != key:
+            return None
+
+        def load(name):
+            return np.load(os.path.join(path, name), mmap_mode="r")
+
+        series = {
+            column: (load(f"series_{i}_t.npy"), load(f"series_{i}_v.npy"))
+            for i, column in enumerate(info["columns"])
+        }
+        codes = np.load(os.path.join(path, "log_codes.npy"))
+        table = np.load(os.path.join(path, "log_labels.npy")).astype(object)
+        log_labels = np.full(len(codes), None, dtype=object)
+        found = codes >= 0
+        log_labels[found] = table[codes[found]]
+        log = (load("log_t.npy"), load("log_end.npy"), log_labels, load("log_count.npy"))
+        return series, log, info["meta"]
+    except (OSError, ValueError, KeyError) as e:
+        if not isinstance(e, FileNotFoundError):
+            print(f"[snapshot] ignoring unreadable snapshot {path}: {e}")
+        return None
@@ -1,5 +1,6 @@
 
 from get_data  import Database
+from views.playback import playback_clock, frame_table, LOADING_TEXT
 from bokeh.models import Div
 database = Database()
 
@@ -8,28 +9,26 @@ def format_class(class_output:str):
     output = class_output.split(" ")[0]
     if output == 'unexpected':
         output = class_output.split(":")[1].split(" ")[1]
-    
+
     return output
 
-def classifier_output(doc):
-    data = database.log_data
-    
-    
-    def update():
+
+def classifier_output_panel(doc):
+
+
+    def update(current_index=None):
         try:
             # Directly modify the text of 'div'
-            current_time = database.current_timestamp
-            # Defensive: if data empty, show placeholder
-            if not data:
+            if not playback_clock.loaded:
+                div.text = LOADING_TEXT
+                return
+            if current_index is None:
+                current_index = playback_clock.index
+            # Joined ahead of time by FrameTable.update_classifier (SegmentSeries.asof_indices)
+            class_output = frame_table.classifier_at(current_index) if len(frame_table) else None
+            # Defensive: if there is no class yet, show placeholder
+            if class_output is None:
                 class_output = "No data"
-            else:
-                # if exact key exists, use it; otherwise choose the nearest key
-                if current_time in data:
-                    class_output = data[current_time]
-                else:
-                    # choose the nearest timestamp key
-                    nearest_key = min(data.keys(), key=lambda k: abs(k - current_time))
-                    class_output = data.get(nearest_key, "No data")
 
             # Ensure it's a string
             class_output = str(class_output)
@@ -46,7 +45,13 @@ def classifier_output(doc):
 
     # Initialize 'div' here so that it's in the scope of 'update'
     div = Div(text="")
-    
 
-    doc.add_root(div)
-    doc.add_periodic_callback(update, 500)  # Update every 250 ms
\ No newline at end of file
+
+    div.name = "classifier_output"
+    update()
+    playback_clock.subscribe(doc, update)
+    return div
+
+
+def classifier_output(doc):
+    doc.add_root(classifier_output_panel(doc))
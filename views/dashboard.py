@@ -0,0 +1,81 @@
+# views/dashboard.py
+from functools import reduce
+from math import gcd
+
+from bokeh.document import Document
+from bokeh.layouts import column, row
+
+from views.kpi_graph import kpi_graph_panel
+from views.rbs_assigned import rbs_assigned_panel
+from views.classifier_output import classifier_output_panel
+from views.scheduling_policy import scheduling_policy_panel
+from views.toggle_switch import toggle_switch_panel
+from views.image_pairs import image_pairs_panel
+from views.rays_animated import animate_rays_panel
+from views.loss_epoch import loss_epoch_panel
+from views.event_timeline import event_timeline_panel
+
+
+class PanelScheduler:
+    """
+    Runs the periodic work of every panel in a document from a single
+    periodic callback. The callback fires at the gcd of the requested
+    periods and each job runs on the ticks that are a multiple of its period.
+    """
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.jobs = []
+        self.tick_ms = None
+        self.ticks = 0
+
+    def add_periodic_callback(self, callback, period_ms):
+        self.jobs.append((callback, period_ms))
+
+    def start(self):
+        if not self.jobs:
+            return
+        self.tick_ms = reduce(gcd, [period for _, period in self.jobs])
+        self.doc.add_periodic_callback(self.tick, self.tick_ms)
+
+    def tick(self):
+        self.ticks += 1
+        elapsed = self.ticks * self.tick_ms
+        for callback, period_ms in self.jobs:
+            if elapsed % period_ms == 0:
+                try:
+                    callback()
+                except Exception as e:
+                    # One failing panel should not stop the others
+                    print(f"[dashboard.tick] error in {getattr(callback, '__qualname__', callback)}: {e}")
+
+
+def dashboard_app(doc: Document):
+    """
+    Every panel in one Document, so a page view costs one websocket session.
+    Replay panels follow the shared playback clock; the others are driven by
+    one PanelScheduler. Each panel keeps its own name (graphs, rbs_assigned,
+    ...) so it can be looked up with doc.get_model_by_name().
+    """
+    scheduler = PanelScheduler(doc)
+    schedule = scheduler.add_periodic_callback
+
+    panels = [
+        kpi_graph_panel(doc),
+        rbs_assigned_panel(doc),
+        classifier_output_panel(doc),
+        scheduling_policy_panel(doc),
+        toggle_switch_panel(doc, schedule),
+        image_pairs_panel(doc, schedule),
+        animate_rays_panel(doc, schedule),
+        loss_epoch_panel(doc, schedule),
+        event_timeline_panel(doc),
+    ]
+    graphs, rbs, classifier, policy, toggle, pairs, rays, loss, timeline = panels
+
+    status = column(*[panel for panel in (rbs, classifier, policy, toggle) if panel is not None])
+    top = row(*[panel for panel in (pairs, rays) if panel is not None])
+    bottom = row(*[panel for panel in (graphs, status, loss) if panel is not None])
+
+    doc.add_root(column(top, bottom, timeline, name="dashboard"))
+    scheduler.start()
@@ -0,0 +1,107 @@
+# views/event_timeline.py
+import numpy as np
+from bokeh.events import Tap
+from bokeh.layouts import column, row
+from bokeh.models import Button, ColumnDataSource, Div, Span
+from bokeh.plotting import figure
+
+from event_index import INTERFERENCE_ONSET, POLICY_SWITCH, is_interference
+from views.playback import playback_clock, frame_table, database, LOADING_TEXT
+
+timeline_background_color = (37, 37, 37)
+tick_color = 'white'
+interference_color = 'red'
+policy_color = 'orange'
+
+
+def timeline_data():
+    """
+    Interference periods (from the classifier segments) and policy switch
+    times for the whole timeline. A period lasts until the next segment
+    starts, i.e. until the xApp logs a different class.
+    """
+    log = database.log_series
+    flags = np.array([is_interference(label) for label in log.v], dtype=bool)
+    ends = np.append(log.t[1:], log.end[-1:]) if len(log) else log.end
+    switches = frame_table.events.times.get(POLICY_SWITCH, np.empty(0, dtype=np.int64))
+    return (
+        {'left': log.t[flags].astype(np.float64), 'right': ends[flags].astype(np.float64)},
+        {'x': switches.astype(np.float64)},
+    )
+
+
+def event_timeline_panel(doc):
+    """
+    Overview of the run with buttons that move the shared replay to the
+    previous/next interference onset or scheduling policy switch; clicking
+    the timeline seeks to that time. Every jump is a binary search over the
+    event index and one over the frame times.
+    """
+    interference_source = ColumnDataSource(data={'left': [], 'right': []})
+    policy_source = ColumnDataSource(data={'x': []})
+    state = {"version": None}
+
+    p = figure(x_axis_type="datetime", height=110, width=900, tools=[], toolbar_location=None,
+               y_range=(0, 1), title="Interference (red) and policy switches (orange)")
+    p.quad(left='left', right='right', bottom=0, top=1, source=interference_source,
+           color=interference_color, alpha=0.6)
+    p.segment(x0='x', x1='x', y0=0, y1=1, source=policy_source, color=policy_color, line_width=2)
+    position = Span(dimension='height', location=0, line_color=tick_color, line_width=2)
+    p.add_layout(position)
+    p.yaxis.visible = False
+    p.grid.grid_line_color = None
+    p.background_fill_color = timeline_background_color
+    p.border_fill_color = timeline_background_color
+    p.outline_line_color = timeline_background_color
+    p.title.text_color = tick_color
+    p.xaxis.major_tick_line_color = tick_color
+    p.xaxis.minor_tick_line_color = tick_color
+    p.xaxis.major_label_text_color = tick_color
+
+    status = Div(text=LOADING_TEXT if not playback_clock.loaded else "")
+
+    def jump(kind, forward, label):
+        if not playback_clock.loaded or not len(frame_table):
+            return
+        index = playback_clock.index
+        if forward:
+            target = frame_table.events.next_after(kind, frame_table.t[index])
+        else:
+            # Events that map to an earlier frame than the current one
+            target = frame_table.events.last_at_or_before(kind, frame_table.t[index - 1]) if index > 0 else None
+        if target is None:
+            status.text = f"No {'later' if forward else 'earlier'} {label}"
+            return
+        status.text = ""
+        playback_clock.seek_time(target)
+
+    buttons = []
+    for kind, label in ((INTERFERENCE_ONSET, "interference onset"), (POLICY_SWITCH, "policy switch")):
+        previous_button = Button(label=f"◀ {label}", width=170)
+        next_button = Button(label=f"{label} ▶", width=170)
+        previous_button.on_click(lambda event, kind=kind, label=label: jump(kind, False, label))
+        next_button.on_click(lambda event, kind=kind, label=label: jump(kind, True, label))
+        buttons += [previous_button, next_button]
+
+    p.on_event(Tap, lambda event: playback_clock.seek_time(event.x))
+
+    def update(current_index=None):
+        if not playback_clock.loaded or not len(frame_table):
+            return
+        if current_index is None:
+            current_index = playback_clock.index
+        if state["version"] != frame_table.events.version:
+            # Only when the log or the policy changed (load, live appends)
+            interference_source.data, policy_source.data = timeline_data()
+            state["version"] = frame_table.events.version
+        if status.text == LOADING_TEXT:
+            status.text = ""
+        position.location = float(frame_table.t[current_index])
+
+    update()
+    playback_clock.subscribe(doc, update)
+    return column(p, row(*buttons, status), name="event_timeline")
+
+
+def event_timeline(doc):
+    doc.add_root(event_timeline_panel(doc))
@@ -1,20 +1,52 @@
 # views/image_pairs.py
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+from functools import partial
 from glob import glob
 import numpy as np
 
 from bokeh.plotting import figure
-from bokeh.models import ColumnDataSource
+from bokeh.models import ColumnDataSource, LinearColorMapper
+from bokeh.palettes import Blues256, Oranges256
 from bokeh.layouts import row
 from bokeh.document import Document
 
+from views.transport import measured
+
 # Directory where your numpy files live. Adapt as needed.
 NP_FOLDER = os.path.join(os.path.dirname(__file__), "..", "data", "pairs")
 
+# Uncompressed copies of the .npz batches, memory-mapped instead of decompressed per read
+MMAP_FOLDER = os.getenv("PAIR_MMAP_FOLDER", os.path.join(NP_FOLDER, ".mmap"))
+
+# Batches after the one on screen that are materialized ahead of time
+PAIR_PREFETCH = int(os.getenv("PAIR_PREFETCH", 2))
+
+# Memory budget for decoded pairs shared by all sessions of this process
+PAIR_CACHE_BYTES = int(os.getenv("PAIR_CACHE_BYTES", 64 * 1024 * 1024))
+
+# Batches with more symbols than this are drawn as a density image instead of dots
+PAIR_DENSITY_THRESHOLD = int(os.getenv("PAIR_DENSITY_THRESHOLD", 20000))
+PAIR_DENSITY_BINS = int(os.getenv("PAIR_DENSITY_BINS", 128))
+# Both constellation plots show [-PAIR_LIMIT, PAIR_LIMIT] on each axis
+PAIR_LIMIT = 1.3
+
+# Follow NP_FOLDER for batches written after startup (PAIR_WATCH=0 disables it)
+PAIR_WATCH = os.getenv("PAIR_WATCH", "1") == "1"
+PAIR_WATCH_PATTERN = os.getenv("PAIR_WATCH_PATTERN", "batch_*.npz")
+PAIR_WATCH_INTERVAL = float(os.getenv("PAIR_WATCH_INTERVAL", 1.0))
+PAIR_WORKERS = int(os.getenv("PAIR_WORKERS", 2))
+
+EMPTY = np.empty(0, dtype=np.float32)
+
+
 def load_pair_from_file(path):
     """
     Load a file and return one pair in the normalized format:
-      ((left_x_list, left_y_list), (right_x_list, right_y_list))
+      ((left_x, left_y), (right_x, right_y)) as 1D NumPy arrays
 
     Supported:
       - .npz file with 'ratio_batch' and 'demapper_batch' (this matches your saved files).
@@ -29,25 +61,15 @@ def load_pair_from_file(path):
 
         # Prefer explicit saved format
         if "ratio_batch" in npz and "demapper_batch" in npz:
-            r = np.asarray(npz["ratio_batch"])
-            d = np.asarray(npz["demapper_batch"])
-
-            # Ensure 1D arrays
-            r = r.ravel()
-            d = d.ravel()
-
-            # Convert complex -> real/imag lists
-            left_x = r.real.tolist()
-            left_y = r.imag.tolist()
-            right_x = d.real.tolist()
-            right_y = d.imag.tolist()
-            return ((left_x, left_y), (right_x, right_y))
+            r = np.asarray(npz["ratio_batch"]).ravel()
+            d = np.asarray(npz["demapper_batch"]).ravel()
+            return ((r.real, r.imag), (d.real, d.imag))
 
         # Fallback: x/y arrays saved in npz (treat as coordinates for left plot)
         if "x" in npz and "y" in npz:
             x = np.asarray(npz["x"]).ravel()
             y = np.asarray(npz["y"]).ravel()
-            return ((x.tolist(), y.tolist()), ([], []))
+            return ((x, y), (EMPTY, EMPTY))
 
         # Generic: take first two arrays (if present)
         if len(keys) >= 2:
@@ -56,85 +78,402 @@ def load_pair_from_file(path):
 
             # If they are complex, treat as complex pairs
             if np.iscomplexobj(a) and np.iscomplexobj(b):
-                left_x = a.real.tolist()
-                left_y = a.imag.tolist()
-                right_x = b.real.tolist()
-                right_y = b.imag.tolist()
-                return ((left_x, left_y), (right_x, right_y))
+                return ((a.real, a.imag), (b.real, b.imag))
             else:
                 # treat a,b as x and y coordinates for left
-                return ((a.tolist(), b.tolist()), ([], []))
+                return ((a, b), (EMPTY, EMPTY))
 
         raise ValueError(f"npz file {path} has no usable arrays")
 
     elif path.endswith(".npy"):
-        arr = np.load(path, allow_pickle=True)
-        arr = np.asarray(arr)
+        arr = np.asarray(np.load(path, allow_pickle=True))
         # if arr is 2 x N (rows: x,y) or (2,N)
         if arr.ndim == 2 and arr.shape[0] >= 2:
-            x = arr[0].ravel().tolist()
-            y = arr[1].ravel().tolist()
-            return ((x, y), ([], []))
+            return ((arr[0].ravel(), arr[1].ravel()), (EMPTY, EMPTY))
         # If it's 1D or other shapes, try to interpret as x coords only (no y)
         raise ValueError(f"npy file {path} not in expected shape (2,N)")
 
     else:
         raise ValueError("Unsupported extension")
 
-def discover_pairs(folder):
+
+def density_image(x, y, limit, bins=PAIR_DENSITY_BINS):
+    """
+    Bin symbols into a bins x bins grid over [-limit, limit]^2 and return
+    log(1 + count) as float32, rows along y as Bokeh's image glyph expects.
+    Empty cells are NaN so they are drawn transparent. The size of the
+    result does not depend on the number of symbols.
+    """
+    # Same bins as np.histogram2d(x, y, bins, range=[[-limit, limit]] * 2), but
+    # with one bincount over flat cell indices, which is several times faster
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    inside = (np.abs(x) <= limit) & (np.abs(y) <= limit)
+    scale = bins / (2 * limit)
+    # The upper edge belongs to the last bin, as in histogram2d
+    ix = np.minimum(((x[inside] + limit) * scale).astype(np.intp), bins - 1)
+    iy = np.minimum(((y[inside] + limit) * scale).astype(np.intp), bins - 1)
+    counts = np.bincount(iy * bins + ix, minlength=bins * bins).reshape(bins, bins)
+    image = np.log1p(counts).astype(np.float32)
+    image[image == 0] = np.nan
+    return image
+
+
+def batch_density(x, y):
+    """Density image of one side of a batch, or None if it is drawn as dots."""
+    if min(len(x), len(y)) <= PAIR_DENSITY_THRESHOLD:
+        return None
+    return density_image(x, y, PAIR_LIMIT)
+
+
+class PairCache:
+    """
+    Bounded LRU of decoded pairs, shared by every session in the process.
+
+    Keys are (paths, mtime), so a rewritten file never hits an old entry;
+    invalidate() drops every entry of a path. Values are (pair, images):
+    float32 ((left_x, left_y), (right_x, right_y)) arrays that can be put
+    into a ColumnDataSource as they are, and the (left, right) density images
+    of the sides with more than PAIR_DENSITY_THRESHOLD symbols (None for the
+    others), so each image is binned once per process. Least recently used
+    entries are evicted once the total size exceeds max_bytes.
+    """
+
+    def __init__(self, max_bytes=PAIR_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()   # (paths, mtime) -> ((pair, images), nbytes)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return item[0]
+
+    def put(self, key, batch):
+        pair, images = batch
+        nbytes = sum(a.nbytes for side in pair for a in side)
+        nbytes += sum(image.nbytes for image in images if image is not None)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            self._entries[key] = (batch, nbytes)
+            self.nbytes += nbytes
+            # Keep at least the pair just added, even if it alone is over budget
+            while self.nbytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+                self.evictions += 1
+
+    def invalidate(self, paths):
+        """Drop all cached versions of one file (or _x/_y file pair)."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == paths]:
+                self.nbytes -= self._entries.pop(key)[1]
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "bytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class PairCatalog:
+    """
+    Process-wide, lazily loaded list of constellation pairs.
+
+    The folder is scanned once for file names and mtimes; no array is read
+    until its pair is requested. Compressed .npz batches are converted once
+    into uncompressed (2, N) float32 .npy files under MMAP_FOLDER and opened
+    with mmap_mode='r', *_x.npy / *_y.npy pairs are mapped directly. Pairs
+    are decoded out of the maps into the shared PairCache, so memory does not
+    grow with the number of batches or viewers.
+
+    With an `executor`, get() never converts or decodes on the caller's
+    thread (the Bokeh IOLoop): the requested pair and the next `prefetch`
+    ones are decoded in the executor, and get() returns None until the
+    requested one is ready.
+    """
+
+    def __init__(self, folder, store=MMAP_FOLDER, prefetch=PAIR_PREFETCH, cache=None, executor=None):
+        self.folder = folder
+        self.store = store
+        self.prefetch = prefetch
+        self.cache = cache if cache is not None else PairCache()
+        self.executor = executor
+        self.entries = []   # [{"paths": (...), "mtime": float}, ...]
+        self.known = set()  # every path in entries
+        self._lock = threading.Lock()
+        self._loading = {}  # (paths, mtime) -> Future of a background decode
+        self._errors = {}   # (paths, mtime) -> exception of a failed background decode
+        self.scan()
+
+    def scan(self):
+        """
+        Collect file names and mtimes:
+          - *.npz files (each becomes one pair if it matches expected keys)
+          - *_x.npy / *_y.npy pairs (converted to left plot)
+        """
+        entries = []
+        for f in sorted(glob(os.path.join(self.folder, "*.npz"))):
+            entries.append({"paths": (f,), "mtime": os.path.getmtime(f)})
+        for xf in sorted(glob(os.path.join(self.folder, "*_x.npy"))):
+            yf = xf.replace("_x.npy", "_y.npy")
+            if os.path.exists(yf):
+                entries.append({"paths": (xf, yf), "mtime": max(os.path.getmtime(xf), os.path.getmtime(yf))})
+        self.entries = entries
+        self.known = {path for entry in entries for path in entry["paths"]}
+
+    def __len__(self):
+        return len(self.entries) or len(SYNTHETIC_PAIRS)
+
+    def _converted(self, path, mtime):
+        """Paths of the uncompressed left/right arrays for one .npz, converting it if stale."""
+        stem = os.path.splitext(os.path.basename(path))[0]
+        targets = [os.path.join(self.store, f"{stem}.{side}.npy") for side in ("left", "right")]
+        if all(os.path.exists(t) and os.path.getmtime(t) >= mtime for t in targets):
+            return targets
+
+        os.makedirs(self.store, exist_ok=True)
+        for target, (x, y) in zip(targets, load_pair_from_file(path)):
+            tmp = target + ".tmp"
+            with open(tmp, "wb") as f:
+                # float32 like the cache, so the copy and its reads are half the size
+                np.save(f, np.stack([np.asarray(x, dtype=np.float32), np.asarray(y, dtype=np.float32)]))
+            os.replace(tmp, target)
+        return targets
+
+    def _open(self, entry):
+        """Memory-mapped ((left_x, left_y), (right_x, right_y)) for one entry."""
+        paths = entry["paths"]
+        if len(paths) == 2:
+            x = np.load(paths[0], mmap_mode="r").ravel()
+            y = np.load(paths[1], mmap_mode="r").ravel()
+            return ((x, y), (EMPTY, EMPTY))
+        left, right = (np.load(p, mmap_mode="r") for p in self._converted(paths[0], entry["mtime"]))
+        return ((left[0], left[1]), (right[0], right[1]))
+
+    def add(self, path):
+        """
+        Convert and decode one new .npz, then append it. Meant to run in a
+        worker thread; sessions only see the batch once it is fully readable.
+        """
+        entry = {"paths": (path,), "mtime": os.path.getmtime(path)}
+        self._decode(entry)
+        with self._lock:
+            if path not in self.known:
+                self.entries.append(entry)
+                self.known.add(path)
+
+    def _key(self, entry):
+        paths = entry["paths"]
+        # One stat per read notices files rewritten in place
+        mtime = max(os.path.getmtime(p) for p in paths)
+        if mtime != entry["mtime"]:
+            self.cache.invalidate(paths)
+            entry["mtime"] = mtime
+        return (paths, mtime)
+
+    def _decode(self, entry, key=None):
+        key = key or self._key(entry)
+        batch = self.cache.get(key)
+        if batch is None:
+            (lx, ly), (rx, ry) = self._open(entry)
+            pair = tuple(
+                (np.asarray(x, dtype=np.float32), np.asarray(y, dtype=np.float32))
+                for x, y in ((lx, ly), (rx, ry))
+            )
+            batch = (pair, tuple(batch_density(x, y) for x, y in pair))
+            self.cache.put(key, batch)
+        return batch
+
+    def _materialize(self, index):
+        """Decoded (pair, images) for one entry, or None while it is decoded in the executor."""
+        entry = self.entries[index]
+        if self.executor is None:
+            return self._decode(entry)
+        key = self._key(entry)
+        batch = self.cache.get(key)
+        if batch is not None:
+            return batch
+        with self._lock:
+            error = self._errors.pop(key, None)
+            if error is not None:
+                raise error
+            if key not in self._loading:
+                future = self.executor.submit(self._decode, entry, key)
+                self._loading[key] = future
+                future.add_done_callback(partial(self._loaded, key))
+        return None
+
+    def _loaded(self, key, future):
+        with self._lock:
+            self._loading.pop(key, None)
+            if future.exception() is not None:
+                self._errors[key] = future.exception()
+
+    def get(self, index):
+        """
+        (pair, images) at `index` (wrapping around), or None if it is not
+        decoded yet; also starts decoding the next few.
+        """
+        if not self.entries:
+            return SYNTHETIC_PAIRS[index % len(SYNTHETIC_PAIRS)], (None, None)
+        index %= len(self.entries)
+        batch = self._materialize(index)
+        for ahead in range(1, min(self.prefetch, len(self.entries) - 1) + 1):
+            ahead_index = (index + ahead) % len(self.entries)
+            try:
+                self._materialize(ahead_index)
+            except Exception as e:
+                # A broken batch is reported when it is due, not while prefetching
+                print(f"[PairCatalog] prefetch failed for {self.entries[ahead_index]['paths'][0]}: {e}")
+        return batch
+
+
+# Fallback synthetic pairs if nothing found
+_t = np.linspace(-1.3, 1.3, 128, dtype=np.float32)
+SYNTHETIC_PAIRS = [
+    ((_t, 0.5 * np.sin(2*np.pi*_t)), (EMPTY, EMPTY)),
+    ((_t, 0.5 * np.cos(2*np.pi*_t)), (EMPTY, EMPTY)),
+]
+
+class PairWatcher:
     """
-    Discover files in `folder` and return list of pairs:
-      [ ((left_x,left_y),(right_x,right_y)), ... ]
-    The function looks for:
-      - *.npz files (each becomes one pair if it matches expected keys)
-      - *_x.npy / *_y.npy pairs (converted to left plot)
-    If nothing is found, it returns a small synthetic fallback list.
+    Background thread that appends new batch files to a PairCatalog.
+
+    It uses inotify (the optional inotify_simple package, Linux only) to hear
+    about files closed after writing or moved into the folder, and falls back
+    to listing the folder every `interval` seconds. New files are decoded in
+    the shared worker pool, so the IOLoop never waits for a batch. A file that
+    cannot be read yet (still being written) is retried once its mtime moves.
     """
-    pairs = []
 
-    # 1) .npz files
-    npz_files = sorted(glob(os.path.join(folder, "*.npz")))
-    for f in npz_files:
+    def __init__(self, catalog, pool, pattern=PAIR_WATCH_PATTERN, interval=PAIR_WATCH_INTERVAL):
+        self.catalog = catalog
+        self.folder = catalog.folder
+        self.pattern = pattern
+        self.interval = interval
+        self.pool = pool
+        self.mode = None
+        self._pending = set()
+        self._failed = {}    # path -> mtime of the copy that could not be read
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name="pair-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def submit(self, path):
+        if path in self.catalog.known:
+            return
         try:
-            pair = load_pair_from_file(f)
-            pairs.append(pair)
-        except Exception as e:
-            # skip malformed files silently (or print for debug)
-            # print(f"Skipping {f}: {e}")
-            continue
-
-    # 2) .npy files with naming scheme *_x.npy, *_y.npy
-    x_files = sorted(glob(os.path.join(folder, "*_x.npy")))
-    for xf in x_files:
-        yf = xf.replace("_x.npy", "_y.npy")
-        if os.path.exists(yf):
+            mtime = os.path.getmtime(path)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            if path in self._pending or self._failed.get(path) == mtime:
+                return
+            self._pending.add(path)
+        future = self.pool.submit(self.catalog.add, path)
+        future.add_done_callback(partial(self._done, path, mtime))
+
+    def _done(self, path, mtime, future):
+        with self._lock:
+            self._pending.discard(path)
+            if future.exception() is not None:
+                self._failed[path] = mtime
+            else:
+                self._failed.pop(path, None)
+        if future.exception() is not None:
+            print(f"[PairWatcher] could not load {path}: {future.exception()}")
+
+    def scan_new(self):
+        for entry in os.scandir(self.folder):
+            if entry.is_file() and fnmatch(entry.name, self.pattern):
+                self.submit(entry.path)
+
+    def run(self):
+        try:
+            self.watch_inotify()
+        except (ImportError, OSError) as e:
+            print(f"[PairWatcher] inotify unavailable ({e}), polling {self.folder} every {self.interval}s")
+            self.poll()
+
+    def watch_inotify(self):
+        from inotify_simple import INotify, flags
+
+        inotify = INotify()
+        try:
+            inotify.add_watch(self.folder, flags.CLOSE_WRITE | flags.MOVED_TO)
+            self.mode = "inotify"
+            # Files that landed between the catalog scan and the watch
+            self.scan_new()
+            while not self._stop.is_set():
+                for event in inotify.read(timeout=int(self.interval * 1000)):
+                    if fnmatch(event.name, self.pattern):
+                        self.submit(os.path.join(self.folder, event.name))
+        finally:
+            inotify.close()
+
+    def poll(self):
+        self.mode = "polling"
+        while not self._stop.is_set():
             try:
-                x_arr = np.load(xf, allow_pickle=True).ravel().tolist()
-                y_arr = np.load(yf, allow_pickle=True).ravel().tolist()
-                pairs.append(((x_arr, y_arr), ([], [])))
-            except Exception:
-                continue
-
-    # 3) Fallback synthetic pairs if nothing found
-    if not pairs:
-        t = np.linspace(-1.3, 1.3, 128)
-        pairs = [
-            ((t.tolist(), (0.5 * np.sin(2*np.pi*t)).tolist()), ([], [])),
-            ((t.tolist(), (0.5 * np.cos(2*np.pi*t)).tolist()), ([], []))
-        ]
-    return pairs
+                self.scan_new()
+            except OSError as e:
+                print(f"[PairWatcher] error listing {self.folder}: {e}")
+            self._stop.wait(self.interval)
 
-def image_pairs_app(doc: Document):
-    # Discover/load all pairs (preloads into memory)
-    pairs = discover_pairs(NP_FOLDER)
+
+# Decodes batches for the catalog (prefetch) and the watcher (new files);
+# its threads are only created when the first job is submitted
+pair_pool = ThreadPoolExecutor(max_workers=PAIR_WORKERS, thread_name_prefix="pair-loader")
+
+pair_catalog = PairCatalog(NP_FOLDER, executor=pair_pool)
+
+# Started by the first image pairs session, not at import
+pair_watcher = PairWatcher(pair_catalog, pair_pool)
+
+
+def image_pairs_panel(doc: Document, add_periodic_callback=None):
+    if PAIR_WATCH and os.path.isdir(NP_FOLDER):
+        pair_watcher.start()
 
     # Shared settings
-    limit = 1.3
+    limit = PAIR_LIMIT
     x_min, x_max, y_min, y_max = -limit, limit, -limit, limit
 
     # Create two ColumnDataSources
-    src_left = ColumnDataSource(data=dict(x=[], y=[]))
-    src_right = ColumnDataSource(data=dict(x=[], y=[]))
+    src_left = ColumnDataSource(data=dict(x=EMPTY, y=EMPTY))
+    src_right = ColumnDataSource(data=dict(x=EMPTY, y=EMPTY))
+
+    # Density mode: one fixed-size image per side instead of one dot per symbol
+    blank = np.full((PAIR_DENSITY_BINS, PAIR_DENSITY_BINS), np.nan, dtype=np.float32)
+    img_left = ColumnDataSource(data=dict(image=[blank]))
+    img_right = ColumnDataSource(data=dict(image=[blank]))
 
     image_size = 390
     p_left = figure(title="", width=image_size, height=image_size,
@@ -146,40 +485,69 @@ def image_pairs_app(doc: Document):
     p_left.scatter('x', 'y', source=src_left, size=24, color="blue", marker="dot")
     p_right.scatter('x', 'y', source=src_right, size=24, color="#e37a31", marker="dot")
 
+    for p, img, palette in ((p_left, img_left, Blues256), (p_right, img_right, Oranges256)):
+        # Palettes run dark to light; dense cells should be dark
+        mapper = LinearColorMapper(palette=palette[::-1], nan_color=(0, 0, 0, 0))
+        p.image(image='image', source=img, x=x_min, y=y_min, dw=x_max - x_min, dh=y_max - y_min,
+                color_mapper=mapper)
+
     p_left.xaxis.axis_label = "Real"
     p_left.yaxis.axis_label = "Imag"
     p_right.xaxis.axis_label = "Real"
     p_right.yaxis.axis_label = "Imag"
 
-    layout = row(p_left, p_right)
-    doc.add_root(layout)
+    layout = row(p_left, p_right, name="image_pairs")
 
-    state = {"idx": 0}
+    state = {"idx": 0, "seen": len(pair_catalog.entries)}
+
+    def show(points, image, xs, ys, density):
+        # Large batches: send a constant-size density image rather than every symbol
+        dense = density is not None
+        if dense:
+            image.data = {"image": [density]}
+        elif image.data["image"][0] is not blank:
+            image.data = {"image": [blank]}
+
+        if len(xs) and len(ys) and not dense:
+            points.data = {"x": xs, "y": ys}
+        elif len(points.data["x"]):
+            points.data = {"x": EMPTY, "y": EMPTY}
 
     def update():
-        if not pairs:
+        # New batches from the watcher: show them in arrival order, then keep rotating
+        if len(pair_catalog.entries) > state["seen"]:
+            state["idx"] = state["seen"]
+            state["seen"] = len(pair_catalog.entries)
+        idx = state["idx"]
+        try:
+            # ((left_x, left_y), (right_x, right_y)), (left density image, right density image)
+            batch = pair_catalog.get(idx)
+        except Exception as e:
+            # skip malformed files
+            print(f"[image_pairs] skipping pair {idx % len(pair_catalog)}: {e}")
+            state["idx"] += 1
             return
-        idx = state["idx"] % len(pairs)
-
-        left, right = pairs[idx]  # left = (left_x, left_y), right = (right_x, right_y)
+        if batch is None:
+            # Still being decoded in the background: keep the current batch on screen
+            return
+        state["idx"] += 1  # step by one
+        (left, right), (left_density, right_density) = batch
         left_x, left_y = left
         right_x, right_y = right
 
-        # If right is empty, show only left (right source cleared)
-        if right_x and right_y:
-            src_right.data = {"x": right_x, "y": right_y}
-        else:
-            src_right.data = {"x": [], "y": []}
-
-        if left_x and left_y:
-            src_left.data = {"x": left_x, "y": left_y}
-        else:
-            src_left.data = {"x": [], "y": []}
-
-        state["idx"] += 1  # step by one
+        # float32 arrays go over the websocket as binary buffers, not JSON lists.
+        # If a side is empty it is cleared (e.g. show only left)
+        show(src_right, img_right, right_x, right_y, right_density)
+        show(src_left, img_left, left_x, left_y, left_density)
 
     # Do initial populate
     update()
 
     # Add periodic callback every 5000 ms (5 seconds)
-    doc.add_periodic_callback(update, 1000)
+    add_periodic_callback = add_periodic_callback or doc.add_periodic_callback
+    add_periodic_callback(measured(doc, "image_pairs", update), 1000)
+    return layout
+
+
+def image_pairs_app(doc: Document):
+    doc.add_root(image_pairs_panel(doc))
@@ -1,15 +1,25 @@
 
+import os
+
 from bokeh.embed import components
 
 
 
 from bokeh.plotting import figure
-from bokeh.models import ColumnDataSource,CustomJSTickFormatter
+from bokeh.events import RangesUpdate
+from bokeh.models import ColumnDataSource,CustomJSTickFormatter,Div,Range1d,Span,Toggle
+from bokeh.models import PanTool,ResetTool,WheelZoomTool
 from bokeh.models.tickers import FixedTicker
 
 
-from bokeh.layouts import gridplot
+from bokeh.layouts import column,gridplot,row
+import numpy as np
+from downsample import MinMaxPyramid
 from get_data  import Database
+from ring_buffer import RingBuffer
+from rolling_stats import KpiStatistics
+from views.playback import playback_clock, frame_table, LOADING_TEXT
+from views.transport import measured
 
 
 
@@ -29,81 +39,284 @@ tick_color = 'white'
 #Connect to the database
 database = Database()
 
-graph_columns , x_values,y_values = database.get_graph_columns(),*database.get_graph_values()
+# Column names are known before the data is loaded
+graph_columns = database.get_graph_columns()
 
 window_size = 21  # Number of data points to display at a time
-current_index = window_size - 1
 num_ticks_to_display = 5
 
-def kpi_graph(doc):
-    # prepare some data
-    sources = {col: ColumnDataSource(data=dict(x=[], y=[])) for col in graph_columns}
-    
-    def update():
-        global current_index
-        current_index += 1
-        
-        for col in graph_columns:
-            # Calculate the start and end index for the current window
-            if current_index < len(x_values[col]):
-                new_x = [x_values[col][current_index]]
-                database.set_current_timestamp(new_x[-1])
-                new_y = [y_values[col][current_index]]
-                new_data = {'x': new_x, 'y': new_y}
-                sources[col].stream(new_data, rollover=window_size)
-            
-                plot = plots_dict[col]
-                plot.xaxis.ticker = sources[col].data['x']
-                latest_ticks = sources[col].data['x'][-window_size::num_ticks_to_display]
-                plots_dict[col].xaxis.ticker = FixedTicker(ticks=latest_ticks,minor_ticks=sources[col].data['x'])
+# Rolling statistics drawn as dashed overlays: the mean throughput, the p95
+# SINR and an EWMA of the requested and granted PRBs
+STATS_WINDOW = int(os.getenv("KPI_STATS_WINDOW", 120))  # frames
+STATS_EWMA_HALFLIFE = float(os.getenv("KPI_STATS_EWMA_HALFLIFE", 20))  # frames
+STATS_QUANTILE = 0.95
+overlays = {
+    'RX Brate Uplink': 'mean',
+    'TX Brate Downlink': 'mean',
+    'UL SINR': 'p95',
+    'PRB Requested': 'ewma',
+    'PRB Granted': 'ewma',
+}
+overlays = {col: kind for col, kind in overlays.items() if col in graph_columns}
+overlay_columns = {col: f"{col} {kind}" for col, kind in overlays.items()}
+
+# Updated once per frame for the whole process, not per session
+kpi_stats = KpiStatistics(
+    graph_columns, STATS_WINDOW,
+    quantile_columns=[col for col, kind in overlays.items() if kind == 'p95'],
+    ewma_halflife=STATS_EWMA_HALFLIFE,
+)
+stats_summary = {"text": ""}
+
+# The newest window_size frames and their overlay values, shared by every
+# session and filled once per playback tick. Slots not written yet are NaN,
+# which Bokeh leaves undrawn. Values are float32 so patches go out as small
+# binary buffers; 'x' stays float64 because float32 cannot hold millisecond
+# timestamps exactly.
+recent_frames = RingBuffer(
+    window_size,
+    {'x': np.float64, **{col: np.float32 for col in graph_columns},
+     **{name: np.float32 for name in overlay_columns.values()}},
+    fill={'x': np.nan, **{col: np.nan for col in graph_columns},
+          **{name: np.nan for name in overlay_columns.values()}},
+)
+recent_state = {"last_index": -1}
+
+
+def overlay_value(col, kind):
+    if kind == 'mean':
+        return kpi_stats.mean(col)
+    if kind == 'p95':
+        return kpi_stats.quantile(col, STATS_QUANTILE)
+    return kpi_stats.ewma(col)
+
+
+def summarize_stats():
+    def fmt(value, unit=""):
+        return "–" if np.isnan(value) else f"{value:.2f}{unit}"
+
+    parts = []
+    for col, kind in overlays.items():
+        if kind == 'mean':
+            parts.append(
+                f"{col} mean {fmt(kpi_stats.mean(col), ' Mbps')} "
+                f"({fmt(kpi_stats.min(col))}–{fmt(kpi_stats.max(col))})"
+            )
+        elif kind == 'p95':
+            parts.append(f"{col} p95 {fmt(kpi_stats.quantile(col, STATS_QUANTILE), ' dB')}")
+    requested, granted = kpi_stats.ewma('PRB Requested'), kpi_stats.ewma('PRB Granted')
+    if not (np.isnan(requested) or np.isnan(granted)):
+        ratio = granted / requested if requested else np.nan
+        parts.append(f"PRB granted / requested (EWMA) {fmt(granted)} / {fmt(requested)} = {fmt(100 * ratio, '%')}")
+    return f"Last {STATS_WINDOW} frames: " + " · ".join(parts)
+
+
+def push_recent_frames(current_index):
+    if current_index >= len(frame_table):
+        return
+    if current_index < recent_state["last_index"]:
+        # The replay was moved back: rebuild the window and the statistics from there
+        recent_frames.clear()
+        kpi_stats.reset()
+        recent_state["last_index"] = -1
+    if current_index == recent_state["last_index"]:
+        return
+    first = max(recent_state["last_index"] + 1, current_index + 1 - window_size)
+    # Every frame is added to the statistics once; after a jump (live mode)
+    # frames older than kpi_stats.memory would not change them anyway
+    fed = max(recent_state["last_index"] + 1, current_index + 1 - kpi_stats.memory)
+    overlay_values = {name: [] for name in overlay_columns.values()}
+    for i in range(fed, current_index + 1):
+        kpi_stats.push(frame_table.kpi[i])
+        if i >= first:
+            for col, kind in overlays.items():
+                overlay_values[overlay_columns[col]].append(overlay_value(col, kind))
+
+    recent_frames.extend({
+        'x': frame_table.t[first:current_index + 1],
+        **{col: frame_table.kpi[first:current_index + 1, i] for i, col in enumerate(graph_columns)},
+        **overlay_values,
+    })
+    recent_state["last_index"] = current_index
+    stats_summary["text"] = summarize_stats()
+
+
+push_recent_frames(playback_clock.index)
+playback_clock.on_tick(push_recent_frames)
+
+# History mode: the whole recording, decimated to about one point per screen
+# pixel for whatever x range is shown. The pyramid is shared by every session
+# and only recomputes its newest buckets when live frames arrive.
+HISTORY_FACTOR = int(os.getenv("KPI_HISTORY_FACTOR", 4))
+history = MinMaxPyramid(HISTORY_FACTOR)
+
+
+def update_history(current_index):
+    history.update(frame_table.t, frame_table.kpi)
+
+
+update_history(playback_clock.index)
+playback_clock.on_tick(update_history)
+
+
+def window_ticks(window_x):
+    shown = window_x[~np.isnan(window_x)]
+    return dict(ticks=shown[::num_ticks_to_display].tolist(), minor_ticks=shown.tolist())
+
+
+def history_columns(x, y):
+    data = {}
+    for i, col in enumerate(graph_columns):
+        # Each column keeps the times of its own minima and maxima
+        data[f"x_{col}"] = x[:, i].astype(np.float64)
+        data[col] = y[:, i].astype(np.float32)
+    return data
+
+
+def style_plot(p):
+    p.xaxis.major_label_orientation = 45
+    #Coloring the plots
+    p.background_fill_color = graph_background_color
+    p.border_fill_color = graph_background_color
+    p.outline_line_color = graph_background_color
+    p.title.text_color= tick_color
+    p.grid.grid_line_width = 1
+    p.grid.grid_line_color = graph_grid_color
+    p.xaxis.major_tick_line_color = tick_color
+    p.xaxis.minor_tick_line_color = tick_color
+    p.xaxis.major_label_text_color = tick_color
+    p.yaxis.major_tick_line_color = tick_color
+    #p.yaxis.minor_tick_line_color = tick_color
+    p.yaxis.major_label_text_color = tick_color
+
+
+def kpi_graph_panel(doc):
+    # One source for all six plots: each graph column is a y column and 'x' is shared.
+    # The columns are fixed-length arrays patched in place from the shared ring
+    # buffer, so a tick never grows or reallocates them.
+    source = ColumnDataSource(data={
+        name: view.copy() for name, view in recent_frames.window(window_size, pad=True).items()
+    })
+
+    # One ticker model shared by every x axis, updated once per tick
+    ticker = FixedTicker(**window_ticks(source.data['x']))
+
+    def update(current_index):
+        # current_index is advanced by the shared playback clock, once per tick for all sessions
+        if plots[0].title.text != graph_columns[0]:
+            # First update after the data arrived: drop the loading note
+            for p, col in zip(plots, graph_columns):
+                p.title.text = col
+            history_toggle.disabled = False
+        stats_div.text = stats_summary["text"]
+        if history_toggle.active:
+            for span in position_spans:
+                span.location = float(frame_table.t[current_index])
+            if len(history) != history_state["rows"]:
+                # Live frames arrived: redraw the range being looked at
+                show_history(history_range.start, history_range.end)
+            return
+        refresh_window()
+
+    def refresh_window():
+        window = recent_frames.window(window_size, pad=True)
+        source.patch({name: [(slice(0, window_size), view)] for name, view in window.items()})
+        ticker.update(**window_ticks(window['x']))
+
+    # ---------------- history mode -------------------------------------------
+    history_source = ColumnDataSource(data=history_columns(
+        np.empty((0, len(graph_columns))), np.empty((0, len(graph_columns)))
+    ))
+    # Shared by the six history plots so they pan and zoom together
+    history_range = Range1d(0, 1)
+    history_state = {"rows": 0, "shown": None}
+
+    def show_history(x_start, x_end):
+        if x_start is None or x_end is None:
+            return
+        # About one point per pixel of plot width
+        max_points = history_plots[0].width
+        key = (x_start, x_end, max_points, len(history))
+        if key == history_state["shown"]:
+            # The six plots share the range, so one pan announces it up to six times
+            return
+        history_state.update(shown=key, rows=len(history))
+        x, y = history.query(x_start, x_end, max_points)
+        history_source.data = history_columns(x, y)
+
+    def toggle_history(attr, old, active):
+        grid.visible = not active
+        history_grid.visible = active
+        if not active:
+            # The window is not patched while hidden
+            refresh_window()
+            return
+        if len(history):
+            start, end = float(history.t[0]), float(history.t[-1])
+            history_range.update(start=start, end=end, reset_start=start, reset_end=end)
+            show_history(start, end)
+            for span in position_spans:
+                span.location = float(frame_table.t[playback_clock.index])
+
+    history_toggle = Toggle(label="History", active=False, disabled=not playback_clock.loaded, width=100)
+    history_toggle.on_change('active', toggle_history)
+    stats_div = Div(text=stats_summary["text"], styles={"color": tick_color, "font-size": "11px"})
 
-        
-           
     plots = []
     plots_dict = {}
     for i,col in enumerate(graph_columns):
-        initial_end_idx = min(window_size, len(x_values[col]))
-        initial_data = {
-            'x': x_values[col][:initial_end_idx], 
-            'y': y_values[col][:initial_end_idx]
-        }
-        sources[col] = ColumnDataSource(data=initial_data)
-
-        p = figure(output_backend="webgl",title=col, toolbar_location=None,tools=[],width=300, height=250)
+        title = col if playback_clock.loaded else f"{col} ({LOADING_TEXT})"
+        p = figure(output_backend="webgl",title=title, toolbar_location=None,tools=[],width=300, height=250)
         p.toolbar_location = None
-        p.line(x='x', y='y', source=sources[col],color=graph_line_colors[i])
-        p.xaxis.major_label_orientation = 45
+        p.line(x='x', y=col, source=source,color=graph_line_colors[i])
+        if col in overlay_columns:
+            p.line(x='x', y=overlay_columns[col], source=source, color=graph_line_colors[i],
+                   line_dash='dashed', line_alpha=0.7)
+        p.xaxis.ticker = ticker
        
         plots_dict[col] = p
         
         p.xaxis.formatter = CustomJSTickFormatter(code="""
-            var hours = Math.floor(tick / 3600000);
-            var minutes = Math.floor((tick % 3600000) / 60000);
-            var seconds = Math.floor((tick % 60000) / 1000);
-            var millis = tick % 1000;
+            // x is UTC epoch milliseconds
+            var date = new Date(tick);
+            var hours = date.getUTCHours();
+            var minutes = date.getUTCMinutes();
+            var seconds = date.getUTCSeconds();
+            var millis = date.getUTCMilliseconds();
             return hours.toString().padStart(2, '0') + ':' + 
                    minutes.toString().padStart(2, '0') + ':' + 
                    seconds.toString().padStart(2, '0') + ':' + 
                    millis.toString().padStart(3, '0');
         """)
 
-        #Coloring the plots
-        p.background_fill_color = graph_background_color
-        p.border_fill_color = graph_background_color
-        p.outline_line_color = graph_background_color
-        p.title.text_color= tick_color
-        p.grid.grid_line_width = 1
-        p.grid.grid_line_color = graph_grid_color
-        p.xaxis.major_tick_line_color = tick_color
-        p.xaxis.minor_tick_line_color = tick_color
-        p.xaxis.major_label_text_color = tick_color
-        p.yaxis.major_tick_line_color = tick_color
-        #p.yaxis.minor_tick_line_color = tick_color
-        p.yaxis.major_label_text_color = tick_color
+        style_plot(p)
         plots.append(p)
-        
+
+    history_plots = []
+    position_spans = []
+    for i, col in enumerate(graph_columns):
+        pan = PanTool(dimensions="width")
+        zoom = WheelZoomTool(dimensions="width")
+        p = figure(output_backend="webgl", title=col, x_axis_type="datetime", x_range=history_range,
+                   tools=[pan, zoom, ResetTool()], active_drag=pan, active_scroll=zoom,
+                   toolbar_location=None, width=300, height=250)
+        p.line(x=f"x_{col}", y=col, source=history_source, color=graph_line_colors[i])
+        span = Span(dimension='height', location=0, line_color=tick_color, line_dash='dashed', line_alpha=0.6)
+        p.add_layout(span)
+        position_spans.append(span)
+        p.on_event(RangesUpdate, lambda event: show_history(event.x0, event.x1))
+        style_plot(p)
+        history_plots.append(p)
+
     grid = gridplot([plots[:3], plots[3:]],toolbar_options=dict(logo=None))
-    
-    doc.add_root(grid)
-    doc.add_periodic_callback(update, 500)  # Update every 250 ms
+    # Each history plot keeps its own pan/zoom tools, active without a visible toolbar
+    history_grid = gridplot([history_plots[:3], history_plots[3:]], merge_tools=False, toolbar_location=None)
+    history_grid.visible = False
+
+    playback_clock.subscribe(doc, measured(doc, "kpi_graph", update))
+    return column(row(history_toggle, stats_div), grid, history_grid, name="graphs")
+
+
+def kpi_graph(doc):
+    doc.add_root(kpi_graph_panel(doc))
     
\ No newline at end of file
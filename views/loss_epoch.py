@@ -22,7 +22,7 @@ line_color = "#7EC8E3"
 first_color = "#8BC34A" 
 last_color ="#FF6F61"   
 
-def loss_epoch_graph(doc: Document):
+def loss_epoch_panel(doc: Document, add_periodic_callback=None):
     try:
         x_range = Range1d(start=0, end=5)
         y_range = Range1d(start=0.03, end=0.065)
@@ -124,13 +124,22 @@ def loss_epoch_graph(doc: Document):
         layout = column(
             p,
             button_layout,
-            sizing_mode="scale_width"
+            sizing_mode="scale_width",
+            name="loss_epoch"
         )
 
-        doc.add_root(layout)
-        doc.add_periodic_callback(update, update_interval_ms)
+        add_periodic_callback = add_periodic_callback or doc.add_periodic_callback
+        add_periodic_callback(update, update_interval_ms)
 
         print("loss_epoch_graph initialized successfully")
+        return layout
 
     except Exception as e:
         print("Error in loss_epoch_graph:", e)
+        return None
+
+
+def loss_epoch_graph(doc: Document):
+    layout = loss_epoch_panel(doc)
+    if layout is not None:
+        doc.add_root(layout)
@@ -0,0 +1,310 @@
+# views/playback.py
+import os
+from functools import partial
+
+import numpy as np
+from tornado.ioloop import PeriodicCallback
+
+from event_index import INTERFERENCE_ONSET, POLICY_SWITCH, EventIndex, interference_onsets
+from get_data import Database
+from live_feed import LiveFeed, LOG_STREAM
+
+PLAYBACK_INTERVAL_MS = int(os.getenv("PLAYBACK_INTERVAL_MS", 500))
+
+# Log and KPI timestamps come from different clocks; a log line this close
+# to the playback time counts as a match even if it is slightly ahead.
+CLASSIFIER_TOLERANCE_MS = int(os.getenv("CLASSIFIER_TOLERANCE_MS", 250))
+
+# LIVE=1: watch Mongo for new KPI buckets and log entries and follow the newest frame
+LIVE = os.getenv("LIVE", "0") == "1"
+
+# Shown by the panels until the Database has finished loading
+LOADING_TEXT = "Loading..."
+
+database = Database()
+
+
+class FrameTable:
+    """
+    Everything the replay shows, aligned ahead of time onto one frame index.
+
+    Row i holds the KPI values (kpi[i], one column per graph column), the
+    slice PRBs, the scheduling policy label and the classifier class for
+    timestamp t[i]. Series that are not sampled on the KPI timeline are
+    joined as-of with binary searches, so a playback tick only has to slice
+    one row.
+
+    `events` holds the interference onsets and policy switches from the
+    Database's run-length-encoded log and policy, for seeking.
+    """
+
+    def __init__(self, database, classifier_tolerance_ms=CLASSIFIER_TOLERANCE_MS):
+        self.database = database
+        self.columns = list(database.get_graph_columns())
+        self.classifier_tolerance_ms = classifier_tolerance_ms
+        self.events = EventIndex()
+        self.reload()
+
+    def reload(self):
+        """Rebuild every row from the Database's current series."""
+        self.log = self.database.log_series
+        # All KPI columns come from the same spreadsheet rows, so the first one defines the timeline
+        times = self.database.get_series(self.columns[0]).t if self.columns else np.empty(0, dtype=np.int64)
+        self.t, self.kpi, self.slice_prb, self.scheduling_policy = self._build_rows(times)
+        self.classifier = np.full(len(self.t), None, dtype=object)
+        self.update_classifier()
+        self.update_policy_events()
+
+    def _build_rows(self, times):
+        kpi = np.column_stack(
+            [self._align(self.database.get_series(col), times) for col in self.columns]
+        ) if self.columns else np.empty((len(times), 0))
+        slice_prb = self._align(self.database.get_series('slice_prb'), times)
+
+        # Map each distinct policy code to its label once instead of on every tick
+        policy_codes = self._align(self.database.get_series('scheduling_policy'), times)
+        policy = np.full(len(times), None, dtype=object)
+        for code in np.unique(policy_codes[~np.isnan(policy_codes)]):
+            policy[policy_codes == code] = self.database.scheduling_policy_map.get(int(code))
+        return times, kpi, slice_prb, policy
+
+    def extend(self):
+        """
+        Append frames for timeline samples newer than the last frame (live data).
+        Returns the number of frames added.
+
+        Every column arrives as its own live update, so a frame is only added
+        once all the series it joins have reached its time; a frame cut earlier
+        would hold the previous sample of the late columns for good.
+        """
+        if not self.columns:
+            return 0
+        complete_until = self._complete_until()
+        if complete_until is None:
+            # No KPI sample has arrived yet
+            return 0
+        timeline = self.database.get_series(self.columns[0]).t
+        start = int(np.searchsorted(timeline, self.t[-1], side='right')) if len(self.t) else 0
+        stop = int(np.searchsorted(timeline, complete_until, side='right'))
+        if start >= stop:
+            return 0
+
+        first_new = len(self.t)
+        times, kpi, slice_prb, policy = self._build_rows(timeline[start:stop])
+        self.t = np.concatenate([self.t, times])
+        self.kpi = np.concatenate([self.kpi, kpi])
+        self.slice_prb = np.concatenate([self.slice_prb, slice_prb])
+        self.scheduling_policy = np.concatenate([self.scheduling_policy, policy])
+        self.classifier = np.concatenate([self.classifier, np.full(len(times), None, dtype=object)])
+        self.update_classifier(since=int(self.t[first_new]))
+        self.update_policy_events()
+        return len(times)
+
+    def _complete_until(self):
+        """Newest time every series joined into a frame has a sample for (None if all are empty)."""
+        joined = [self.database.get_series(col) for col in self.columns + ['slice_prb', 'scheduling_policy']]
+        return min((int(series.t[-1]) for series in joined if len(series)), default=None)
+
+    def update_classifier(self, since=None):
+        """(Re)join the classifier log onto the frames at or after `since`."""
+        start = 0
+        if since is not None:
+            start = int(np.searchsorted(self.t, since - self.classifier_tolerance_ms, side='left'))
+        log_index = self.log.asof_indices(self.t[start:], self.classifier_tolerance_ms)
+        found = log_index >= 0
+        self.classifier[start:][found] = self.log.v[log_index[found]]
+        self.events.set(INTERFERENCE_ONSET, interference_onsets(self.log))
+
+    def update_policy_events(self):
+        # Every segment after the first starts with a different policy
+        self.events.set(POLICY_SWITCH, self.database.policy_segments.t[1:])
+
+    def classifier_at(self, index):
+        """
+        Class for frame `index`. Past the end of the KPI recording the newest
+        logged class is shown, so a live log keeps updating the panel.
+        """
+        if index == len(self.t) - 1 and len(self.log) and self.log.end[-1] > self.t[index]:
+            return self.log.v[-1]
+        return self.classifier[index]
+
+    @staticmethod
+    def _align(series, times):
+        index = series.asof_indices(times)
+        values = np.full(len(times), np.nan)
+        found = index >= 0
+        values[found] = series.v[index[found]]
+        return values
+
+    def __len__(self):
+        return len(self.t)
+
+    def index_at(self, t):
+        """First frame at or after t (the last frame if t is past the end)."""
+        return min(int(np.searchsorted(self.t, t, side='left')), max(len(self.t) - 1, 0))
+
+    def kpi_window(self, start, end):
+        data = {'x': self.t[start:end]}
+        for i, col in enumerate(self.columns):
+            data[col] = self.kpi[start:end, i]
+        return data
+
+
+class PlaybackClock:
+    """
+    Single replay position shared by every Bokeh session.
+
+    The clock runs one PeriodicCallback on the Bokeh server IOLoop. Each tick
+    advances the index once, publishes the matching KPI timestamp through
+    database.set_current_timestamp and schedules one next-tick callback per
+    subscribed document, which runs all of that document's view callbacks
+    with the document lock held.
+
+    The first subscription starts loading the Database in the background.
+    Until it is ready `loaded` is False and ticks do nothing; the tick that
+    sees it ready rebuilds the frame table on the IOLoop and updates every
+    session once, replacing their loading state.
+
+    With live=True a LiveFeed is started once the data is loaded; each tick
+    then first applies whatever the feed buffered (new KPI points become new
+    frames, new log lines rejoin the classifier) and the clock follows the
+    newest frame instead of replaying.
+
+    seek_time() moves the shared position to any time (one binary search)
+    and updates every session right away; replay continues from there.
+    """
+
+    def __init__(self, database, frames, interval_ms=PLAYBACK_INTERVAL_MS, start_index=0, live=False):
+        self.database = database
+        self.frames = frames
+        self.interval_ms = interval_ms
+        self.live = live
+        self.feed = None
+        self.loaded = False
+        self.index = start_index
+        self._subscribers = {}   # doc -> [callback(index), ...]
+        self._tick_hooks = []     # process-wide callback(index), run once per tick
+        self._periodic = None
+
+    @property
+    def times(self):
+        return self.frames.t
+
+    def __len__(self):
+        return len(self.frames)
+
+    def subscribe(self, doc, callback):
+        """Call callback(index) inside doc's lock on every tick."""
+        if doc not in self._subscribers:
+            self._subscribers[doc] = []
+            doc.on_session_destroyed(lambda session_context: self.unsubscribe(doc))
+        self._subscribers[doc].append(callback)
+        self.database.load_async()
+        self.start()
+
+    def on_tick(self, callback):
+        """Run callback(index) once per tick for the whole process, before the sessions update."""
+        self._tick_hooks.append(callback)
+
+    def unsubscribe(self, doc):
+        self._subscribers.pop(doc, None)
+        if not self._subscribers:
+            self.stop()
+
+    def start(self):
+        # Subscriptions happen while a session is created, i.e. on the server IOLoop,
+        # which is where PeriodicCallback attaches itself.
+        if self._periodic is None:
+            self._periodic = PeriodicCallback(self.tick, self.interval_ms)
+            self._periodic.start()
+
+    def stop(self):
+        if self._periodic is not None:
+            self._periodic.stop()
+            self._periodic = None
+
+    def load(self):
+        """Adopt the loaded data; runs on the IOLoop so no tick sees a half-built table."""
+        self.frames.reload()
+        if self.live:
+            # Continue from the newest point and log entry the Database already loaded
+            self.feed = LiveFeed(
+                self.database.client, self.database.series.keys(),
+                last_t={column: int(series.t[-1]) for column, series in self.database.series.items() if len(series)},
+                last_log_id=self.database._last_log_entry_id,
+            )
+            self.feed.start()
+            self.index = max(len(self.frames) - 1, 0)
+        else:
+            self.index = min(self.index, max(len(self.frames) - 1, 0))
+        if len(self.frames):
+            self.database.set_current_timestamp(self.frames.t[self.index])
+        self.loaded = True
+
+    def apply_feed(self):
+        """Move buffered live records into the series and frame table; once per tick."""
+        if self.feed is None:
+            return False
+        changed = False
+
+        # The log and the policy are applied on their own, so they keep updating
+        # while no complete KPI frame has arrived
+        times, labels = self.feed.drain(LOG_STREAM)
+        if len(times):
+            dropped = self.database.log_series.append(times, labels)
+            if dropped:
+                print(f"[PlaybackClock] dropped {dropped} late log entries inside a run of another class")
+            self.frames.update_classifier(since=int(times.min()))
+            changed = True
+
+        for column in self.feed.columns:
+            times, values = self.feed.drain(column)
+            if len(times):
+                self.database.append_points(column, times, values)
+                if column == 'scheduling_policy':
+                    self.frames.update_policy_events()
+                    changed = True
+        if self.frames.extend():
+            changed = True
+        return changed
+
+    def tick(self):
+        if not self.loaded:
+            if not self.database.ready.is_set():
+                return
+            # First tick with data: every session shows the start frame
+            self.load()
+        else:
+            changed = self.apply_feed()
+            if self.index + 1 < len(self.frames):
+                # Live: jump to the newest frame; replay: one frame per tick
+                self.index = len(self.frames) - 1 if self.feed is not None else self.index + 1
+                self.database.set_current_timestamp(self.frames.t[self.index])
+            elif not changed:
+                # End of the recording and nothing new: hold the last frame
+                return
+        self._publish()
+
+    def seek_time(self, t):
+        """Jump to the first frame at or after epoch-ms t; runs on the IOLoop like tick()."""
+        if not self.loaded or not len(self.frames):
+            return
+        self.index = self.frames.index_at(t)
+        self.database.set_current_timestamp(self.frames.t[self.index])
+        self._publish()
+
+    def _publish(self):
+        for hook in self._tick_hooks:
+            hook(self.index)
+        for doc, callbacks in list(self._subscribers.items()):
+            doc.add_next_tick_callback(partial(self._dispatch, callbacks, self.index))
+
+    @staticmethod
+    def _dispatch(callbacks, index):
+        for callback in callbacks:
+            callback(index)
+
+
+# Both start empty; the data arrives through PlaybackClock.load()
+frame_table = FrameTable(database)
+playback_clock = PlaybackClock(database, frame_table, live=LIVE)
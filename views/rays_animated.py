@@ -1,16 +1,90 @@
 # views/animate_rays_cycle4.py
-import math
+import os
+from contextlib import contextmanager
+
 import numpy as np
+from bokeh.events import DocumentReady
 from bokeh.plotting import figure
-from bokeh.models import ColumnDataSource
+from bokeh.models import ColumnDataSource, CustomJS
 from bokeh.layouts import column
 from bokeh.document import Document
 
+from views.transport import measured
+
 BACKGROUND_URL = "./static/sionna_scene.png"
 
+# Exported Sionna ray paths to animate instead of the demo scene (see load_sionna_scene)
+RAYS_SCENE_FILE = os.getenv("RAYS_SCENE_FILE", "")
+# Level of detail: only the strongest paths are animated (0 = all)
+RAYS_MAX_PATHS = int(os.getenv("RAYS_MAX_PATHS", 500))
+
+# "client": the browser animates the scene it received once; "server": frames are
+# computed here and pushed to every session on each tick
+RAYS_ANIMATION = os.getenv("RAYS_ANIMATION", "client")
+
+# Browser-side driver for RAYS_ANIMATION=client. The schedule is a closed form
+# of the server engine: after its stagger offset every ray repeats a cycle of
+# growing (1 / grow_speed s), `transmissions` particles (1 / particle_speed s
+# each) and `cycle_pause` s hidden.
+CLIENT_ANIMATION_JS = """
+const width = geometry.width;
+const n_rays = geometry.n_rays;
+const {vx, vy, cum, total} = geometry;
+const grow_time = 1 / schedule.grow_speed;
+const particle_time = 1 / schedule.particle_speed;
+const transmit_time = schedule.transmissions * particle_time;
+const cycle = grow_time + transmit_time + schedule.cycle_pause;
+
+// Walk ray r up to fraction f of its length; returns the polyline and its end point
+function walk(r, f) {
+    const o = r * width;
+    const target = f * total[r];
+    const xs = [vx[o]], ys = [vy[o]];
+    for (let j = 0; j < width - 1; j++) {
+        const a = cum[o + j], b = cum[o + j + 1];
+        if (b < target - 1e-12) {
+            xs.push(vx[o + j + 1]); ys.push(vy[o + j + 1]);
+            continue;
+        }
+        const s = b - a > 1e-12 ? Math.min(Math.max((target - a) / (b - a), 0), 1) : 1;
+        xs.push(vx[o + j] + s * (vx[o + j + 1] - vx[o + j]));
+        ys.push(vy[o + j] + s * (vy[o + j + 1] - vy[o + j]));
+        break;
+    }
+    return [xs, ys];
+}
+
+const started = performance.now();
+
+function frame() {
+    const t = (performance.now() - started) / 1000;
+    const xs = [], ys = [], line_width = [], px = [], py = [];
+    for (let r = 0; r < n_rays; r++) {
+        const local = t - r * schedule.stagger;
+        if (local < 0) continue;
+        const tau = local % cycle;
+        if (tau < grow_time) {
+            const f = tau / grow_time;
+            const [x, y] = walk(r, f);
+            xs.push(x); ys.push(y); line_width.push(1 + 2 * f);
+        } else if (tau < grow_time + transmit_time) {
+            const [x, y] = walk(r, 1);
+            xs.push(x); ys.push(y); line_width.push(3);
+            const [ptx, pty] = walk(r, ((tau - grow_time) % particle_time) / particle_time);
+            px.push(ptx[ptx.length - 1]); py.push(pty[pty.length - 1]);
+        }
+    }
+    rays.data = {xs, ys, line_width};
+    particles.data = {x: px, y: py};
+}
+
+frame();
+setInterval(frame, schedule.update_ms);
+"""
+
 def load_scene():
     """
-    Demo loader: replace with your Sionna loader that returns:
+    Demo scene, used when RAYS_SCENE_FILE is not set. Returns:
       - transmitters: list of dicts [{"x":..., "y":...}, ...]
       - receivers: list of dicts [{"x":..., "y":...}, ...]
       - ray_paths: list of rays where each ray is a list of (x,y) points (tx -> rx)
@@ -36,72 +110,304 @@ def load_scene():
 
     return transmitters, receivers, ray_paths
 
-# ---------------- geometry helpers -----------------------------------------
-def polyline_lengths(points):
-    seg_lengths = []
-    for i in range(len(points)-1):
-        x0, y0 = points[i]; x1, y1 = points[i+1]
-        seg_lengths.append(math.hypot(x1-x0, y1-y0))
-    total = sum(seg_lengths)
-    return seg_lengths, total
-
-def point_along_polyline(points, t):
-    if t <= 0:
-        return points[0]
-    if t >= 1:
-        return points[-1]
-    seg_lengths, total = polyline_lengths(points)
-    target = t * total
-    acc = 0.0
-    for i, L in enumerate(seg_lengths):
-        if acc + L >= target:
-            frac = (target - acc) / (L if L != 0 else 1e-9)
-            x0, y0 = points[i]; x1, y1 = points[i+1]
-            x = x0 + frac * (x1 - x0)
-            y = y0 + frac * (y1 - y0)
-            return (x, y)
-        acc += L
-    return points[-1]
-
-def partial_polyline(points, frac):
-    if frac <= 0:
-        return [points[0][0]], [points[0][1]]
-    if frac >= 1:
-        xs = [p[0] for p in points]; ys = [p[1] for p in points]
-        return xs, ys
-    seg_lengths, total = polyline_lengths(points)
-    target = frac * total
-    acc = 0.0
-    out_x = [points[0][0]]
-    out_y = [points[0][1]]
-    for i, L in enumerate(seg_lengths):
-        if acc + L < target - 1e-12:
-            out_x.append(points[i+1][0]); out_y.append(points[i+1][1])
-        else:
-            remain = target - acc
-            if L <= 1e-12:
-                out_x.append(points[i+1][0]); out_y.append(points[i+1][1])
-            else:
-                frac_seg = remain / L
-                x0, y0 = points[i]; x1, y1 = points[i+1]
-                xi = x0 + frac_seg * (x1 - x0)
-                yi = y0 + frac_seg * (y1 - y0)
-                out_x.append(xi); out_y.append(yi)
-            break
-        acc += L
-    return out_x, out_y
+# ---------------- geometry ------------------------------------------------
+class RayGeometry:
+    """
+    All rays of a scene as padded NumPy arrays.
 
-# ---------------- Bokeh app ------------------------------------------------
-def animate_rays_cycle4_app(doc: Document):
-    txs, rxs, ray_paths = load_scene()
-    if not ray_paths:
+    Row i holds the vertices of ray i in vx/vy; shorter rays repeat their
+    last vertex, so padding adds zero-length segments. cum[i, j] is the path
+    length from the transmitter to vertex j, total[i] the length of the ray.
+    """
+
+    def __init__(self, vx, vy, n_points):
+        self.vx = np.asarray(vx, dtype=np.float64)
+        self.vy = np.asarray(vy, dtype=np.float64)
+        self.n_points = np.asarray(n_points, dtype=np.intp)
+
+        seg = np.hypot(np.diff(self.vx, axis=1), np.diff(self.vy, axis=1))
+        self.cum = np.zeros_like(self.vx)
+        np.cumsum(seg, axis=1, out=self.cum[:, 1:])
+        self.total = self.cum[:, -1].copy()
+
+        # Row offsets make every row of cum lie above the previous one, so one
+        # searchsorted over the flattened array finds the segment for all rays
+        self._row_offset = np.arange(len(self.vx)) * (float(self.total.max(initial=0.0)) + 1.0)
+        self._flat_cum = (self.cum + self._row_offset[:, None]).ravel()
+
+    @classmethod
+    def from_paths(cls, ray_paths):
+        """Build from a list of rays, each a list of (x, y) points (tx -> rx)."""
+        n_points = np.array([len(pts) for pts in ray_paths], dtype=np.intp)
+        width = max(int(n_points.max()), 2) if len(ray_paths) else 2
+        vx = np.empty((len(ray_paths), width))
+        vy = np.empty((len(ray_paths), width))
+        for i, pts in enumerate(ray_paths):
+            pts = np.asarray(pts, dtype=np.float64).reshape(-1, 2)
+            vx[i, :len(pts)] = pts[:, 0]; vx[i, len(pts):] = pts[-1, 0]
+            vy[i, :len(pts)] = pts[:, 1]; vy[i, len(pts):] = pts[-1, 1]
+        return cls(vx, vy, n_points)
+
+    def __len__(self):
+        return len(self.n_points)
+
+    def to_client(self):
+        """Flat float32 arrays for the browser-side animation."""
+        return dict(
+            width=self.vx.shape[1],
+            n_rays=len(self),
+            vx=self.vx.ravel().astype(np.float32),
+            vy=self.vy.ravel().astype(np.float32),
+            cum=self.cum.ravel().astype(np.float32),
+            total=self.total.astype(np.float32),
+        )
+
+    def cut(self, rays, frac):
+        """
+        Point at fraction `frac` of the path length along each ray in `rays`.
+        Returns (k, x, y): vertices 0..k come before the point.
+        """
+        target = frac * self.total[rays]
+        width = self.vx.shape[1]
+        # Vertices strictly before the target (minus vertex 0), as in a walk along the segments
+        pos = np.searchsorted(self._flat_cum, target + self._row_offset[rays] - 1e-12, side="left")
+        k = np.clip(pos - rays * width - 1, 0, width - 2)
+
+        seg_len = self.cum[rays, k + 1] - self.cum[rays, k]
+        seg_frac = np.clip((target - self.cum[rays, k]) / np.maximum(seg_len, 1e-12), 0.0, 1.0)
+        x = self.vx[rays, k] + seg_frac * (self.vx[rays, k + 1] - self.vx[rays, k])
+        y = self.vy[rays, k] + seg_frac * (self.vy[rays, k + 1] - self.vy[rays, k])
+        return k, x, y
+
+    def partial(self, rays, frac):
+        """
+        Polylines from the transmitter to fraction `frac` of each ray, as the
+        xs/ys lists of float32 arrays that MultiLine expects.
+        """
+        if not len(rays):
+            return [], []
+        k, cut_x, cut_y = self.cut(rays, frac)
+        width = self.vx.shape[1]
+        xs = np.empty((len(rays), width + 1), dtype=np.float32)
+        ys = np.empty((len(rays), width + 1), dtype=np.float32)
+        xs[:, :width] = self.vx[rays]
+        ys[:, :width] = self.vy[rays]
+        row = np.arange(len(rays))
+        xs[row, k + 1] = cut_x
+        ys[row, k + 1] = cut_y
+
+        lengths = k + 2
+        keep = np.arange(width + 1) < lengths[:, None]
+        split_at = np.cumsum(lengths)[:-1]
+        return np.split(xs[keep], split_at), np.split(ys[keep], split_at)
+
+
+class RayAnimation:
+    """
+    Animation state of every ray, advanced in one vectorized step.
+
+    Each ray waits until its start time, grows from the transmitter to the
+    receiver, then sends `transmissions` particles along the full path one
+    after another. After the last one the ray disappears and starts again
+    `cycle_pause` seconds later.
+    """
+
+    WAITING, GROWING, TRANSMITTING = 0, 1, 2
+
+    def __init__(self, geometry, grow_speed, particle_speed, cycle_pause, transmissions=4, stagger=0.2):
+        self.geometry = geometry
+        self.grow_speed = grow_speed
+        self.particle_speed = particle_speed
+        self.cycle_pause = cycle_pause
+        self.transmissions = transmissions
+
+        n = len(geometry)
+        self.time = 0.0
+        self.phase = np.full(n, self.WAITING, dtype=np.int8)
+        self.start_time = np.arange(n) * stagger   # staggered first activation
+        self.grow = np.zeros(n)
+        self.particle = np.zeros(n)
+        self.sent = np.zeros(n, dtype=np.intp)
+
+    def step(self, dt):
+        """Advance by dt seconds and return the visible rays and particles."""
+        self.time += dt
+
+        starting = (self.phase == self.WAITING) & (self.time >= self.start_time)
+        self.phase[starting] = self.GROWING
+        self.grow[starting] = 0.0
+        self.particle[starting] = 0.0
+        self.sent[starting] = 0
+
+        # Rays are drawn in the phase they had before this step's transitions
+        growing = self.phase == self.GROWING
+        transmitting = self.phase == self.TRANSMITTING
+
+        self.grow[growing] = np.minimum(self.grow[growing] + self.grow_speed * dt, 1.0)
+        grown = growing & (self.grow >= 1.0)
+        self.phase[grown] = self.TRANSMITTING
+        self.particle[grown] = 0.0
+
+        self.particle[transmitting] = np.minimum(self.particle[transmitting] + self.particle_speed * dt, 1.0)
+        particle_rays = np.flatnonzero(transmitting)
+        _, p_x, p_y = self.geometry.cut(particle_rays, self.particle[particle_rays])
+
+        arrived = transmitting & (self.particle >= 1.0)
+        self.sent[arrived] += 1
+        self.particle[arrived] = 0.0
+        finished = arrived & (self.sent >= self.transmissions)
+        self.phase[finished] = self.WAITING
+        self.start_time[finished] = self.time + self.cycle_pause
+
+        visible = np.flatnonzero(growing | transmitting)
+        frac = np.where(growing[visible], self.grow[visible], 1.0)
+        xs, ys = self.geometry.partial(visible, frac)
+        return {
+            "xs": xs,
+            "ys": ys,
+            "line_width": (1.0 + 2.0 * frac).astype(np.float32),
+            "particle_x": p_x.astype(np.float32),
+            "particle_y": p_y.astype(np.float32),
+        }
+
+# ---------------- Sionna scenes --------------------------------------------
+SCENE_ARRAYS = ("vertices", "num_bounces", "tx_positions", "rx_positions", "tx_index", "rx_index", "gains", "bounds")
+
+
+def save_ray_scene(path, vertices, num_bounces, tx_positions, rx_positions, tx_index, rx_index, gains, bounds):
+    """
+    Write ray paths in the format load_sionna_scene() reads. For P paths with
+    at most D interactions each:
+      - vertices (P, D, 3): interaction points, rows past num_bounces are ignored
+      - num_bounces (P,): valid interactions per path
+      - tx_positions (T, 3), rx_positions (R, 3), tx_index (P,), rx_index (P,)
+      - gains (P,): complex or real path amplitudes
+      - bounds: (x_min, x_max, y_min, y_max), the scene coordinates of the
+        background image's edges, which map to its 0..1 frame
+    A path ending in .npz is written as an uncompressed archive, anything else
+    as a directory of .npy files that can be memory-mapped.
+    """
+    bounds = np.asarray(bounds, dtype=np.float64)
+    if bounds.shape != (4,) or not (bounds[1] > bounds[0] and bounds[3] > bounds[2]):
+        raise ValueError("bounds must be (x_min, x_max, y_min, y_max) with x_min < x_max and y_min < y_max")
+    arrays = dict(
+        vertices=np.asarray(vertices, dtype=np.float32),
+        num_bounces=np.asarray(num_bounces, dtype=np.int32),
+        tx_positions=np.asarray(tx_positions, dtype=np.float32),
+        rx_positions=np.asarray(rx_positions, dtype=np.float32),
+        tx_index=np.asarray(tx_index, dtype=np.int32),
+        rx_index=np.asarray(rx_index, dtype=np.int32),
+        gains=np.asarray(gains),
+        bounds=bounds,
+    )
+    if path.endswith(".npz"):
+        np.savez(path, **arrays)
         return
+    os.makedirs(path, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f"{name}.npy"), array)
+
 
-    # build ray metadata
-    rays_meta = []
-    for pts in ray_paths:
-        seg_lengths, total = polyline_lengths(pts)
-        rays_meta.append({"pts": pts, "seg_lengths": seg_lengths, "total_length": total})
+@contextmanager
+def open_ray_scene(path):
+    """
+    Arrays of a saved scene. .npy directories are memory-mapped; members of
+    an .npz are read whole on access and the archive is closed on exit.
+    """
+    if os.path.isdir(path):
+        yield {
+            os.path.splitext(name)[0]: np.load(os.path.join(path, name), mmap_mode="r")
+            for name in os.listdir(path) if name.endswith(".npy")
+        }
+        return
+    with np.load(path) as scene:
+        yield scene
+
+
+def scene_mtime(path):
+    if os.path.isdir(path):
+        return max([os.path.getmtime(path)] + [os.path.getmtime(os.path.join(path, n)) for n in os.listdir(path)])
+    return os.path.getmtime(path)
+
+
+_scene_cache = {}   # (path, mtime, max_paths) -> (tx_xy, rx_xy, RayGeometry)
+
+
+def load_sionna_scene(path, max_paths=RAYS_MAX_PATHS):
+    """
+    Transmitters, receivers and ray geometry of an exported scene, in the 0..1
+    frame of the background image given by the scene's required `bounds`.
+
+    Only the max_paths strongest paths (by |gain|) are read from the
+    vertex array of a directory scene. Each path becomes tx -> valid interaction points -> rx,
+    padded with the receiver position, and all coordinates are normalized in
+    one pass. The result is cached per file and mtime, so every session of
+    the process shares it.
+    """
+    key = (os.path.abspath(path), scene_mtime(path), max_paths)
+    cached = _scene_cache.get(key)
+    if cached is not None:
+        return cached
+
+    with open_ray_scene(path) as scene:
+        missing = [name for name in SCENE_ARRAYS if name not in scene]
+        if missing:
+            raise ValueError(f"ray scene {path} is missing {', '.join(missing)}")
+
+        strength = np.abs(np.asarray(scene["gains"])).ravel()
+        keep = np.arange(len(strength))
+        if max_paths and len(strength) > max_paths:
+            keep = np.sort(np.argpartition(strength, -max_paths)[-max_paths:])
+
+        # For a directory scene, fancy indexing the memory map reads only the
+        # kept paths; an .npz member is read whole before it is indexed
+        vertices = np.asarray(scene["vertices"][keep], dtype=np.float64)[..., :2]
+        num_bounces = np.asarray(scene["num_bounces"][keep], dtype=np.intp)
+        tx_positions = np.asarray(scene["tx_positions"], dtype=np.float64)[:, :2]
+        rx_positions = np.asarray(scene["rx_positions"], dtype=np.float64)[:, :2]
+        tx = tx_positions[np.asarray(scene["tx_index"][keep], dtype=np.intp)]
+        rx = rx_positions[np.asarray(scene["rx_index"][keep], dtype=np.intp)]
+        # No fallback: the paths' own bounding box is not the image's frame
+        x_min, x_max, y_min, y_max = np.asarray(scene["bounds"], dtype=np.float64)
+
+    # (P, D + 2, 2): transmitter, interactions, receiver; unused interaction slots repeat the receiver
+    depth = vertices.shape[1]
+    points = np.empty((len(keep), depth + 2, 2))
+    points[:, 0] = tx
+    points[:, 1:depth + 1] = vertices
+    points[:, depth + 1] = rx
+    unused = np.arange(depth)[None, :] >= num_bounces[:, None]
+    points[:, 1:depth + 1][unused] = np.broadcast_to(rx[:, None, :], vertices.shape)[unused]
+
+    offset = np.array([x_min, y_min])
+    scale = np.array([max(x_max - x_min, 1e-12), max(y_max - y_min, 1e-12)])
+
+    points = (points - offset) / scale
+    geometry = RayGeometry(points[..., 0], points[..., 1], num_bounces + 2)
+    result = ((tx_positions - offset) / scale, (rx_positions - offset) / scale, geometry)
+
+    # Older versions of a rewritten file are of no further use
+    for old in [k for k in _scene_cache if k[0] == key[0]]:
+        del _scene_cache[old]
+    _scene_cache[key] = result
+    return result
+
+
+def load_scene_geometry():
+    """Transmitter and receiver positions ((N, 2) arrays) and the RayGeometry to animate."""
+    if RAYS_SCENE_FILE:
+        return load_sionna_scene(RAYS_SCENE_FILE)
+    txs, rxs, ray_paths = load_scene()
+    tx_xy = np.array([(t["x"], t["y"]) for t in txs], dtype=np.float64).reshape(-1, 2)
+    rx_xy = np.array([(r["x"], r["y"]) for r in rxs], dtype=np.float64).reshape(-1, 2)
+    return tx_xy, rx_xy, RayGeometry.from_paths(ray_paths)
+
+
+# ---------------- Bokeh app ------------------------------------------------
+def animate_rays_panel(doc: Document, add_periodic_callback=None):
+    tx_xy, rx_xy, geometry = load_scene_geometry()
+    if not len(geometry):
+        return None
 
     # normalized coordinates 0..1
     p = figure(width=900, height=600, x_range=(0,1), y_range=(0,1), tools="")
@@ -111,131 +417,68 @@ def animate_rays_cycle4_app(doc: Document):
     p.image_url(url=[BACKGROUND_URL], x=0, y=1, w=1, h=1, anchor="top_left")
 
     # transmitters as red, receivers as green
-    tx_source = ColumnDataSource(data=dict(x=[t["x"] for t in txs], y=[t["y"] for t in txs]))
+    tx_source = ColumnDataSource(data=dict(x=tx_xy[:, 0].astype(np.float32), y=tx_xy[:, 1].astype(np.float32)))
     p.circle('x','y', source=tx_source, size=12, fill_color="red", line_color="black", alpha=0.95)
 
-    rx_source = ColumnDataSource(data=dict(x=[r["x"] for r in rxs], y=[r["y"] for r in rxs]))
+    rx_source = ColumnDataSource(data=dict(x=rx_xy[:, 0].astype(np.float32), y=rx_xy[:, 1].astype(np.float32)))
     p.square('x','y', source=rx_source, size=10, fill_color="green", line_color="black", alpha=0.95)
 
     # MultiLine for visible (growing or full) rays
-    visible_rays_source = ColumnDataSource(data=dict(xs=[], ys=[], line_width=[]))
+    visible_rays_source = ColumnDataSource(data=dict(xs=[], ys=[], line_width=np.empty(0, dtype=np.float32)))
     p.multi_line(xs='xs', ys='ys', source=visible_rays_source,
                  line_color="cyan", line_alpha=0.9, line_width='line_width')
 
-    # Particles moving along rays (one particle per active ray)
-    particles_source = ColumnDataSource(data=dict(x=[], y=[], size=[], color=[]))
-    p.circle('x','y', source=particles_source, size='size', fill_color='color', line_color='black')
+    # Particles moving along rays (one particle per active ray). Size and color
+    # are the same for every particle, so they are glyph constants, not columns.
+    particles_source = ColumnDataSource(data=dict(x=np.empty(0, dtype=np.float32), y=np.empty(0, dtype=np.float32)))
+    p.circle('x','y', source=particles_source, size=8, fill_color="yellow", line_color='black')
 
-    doc.add_root(column(p))
+    layout = column(p, name="animate_rays")
 
     # Animation configuration
     UPDATE_MS = 50              # 50 ms tick (~20 FPS)
     dt = UPDATE_MS / 1000.0     # seconds per tick
-    grow_speed = 0.6            # fraction/sec for ray growth (tune)
-    particle_speed = 0.4        # fraction/sec for particle progress (tune)
-    cycle_pause = 2.0           # seconds to wait between cycles for each ray
-
-    # activation schedule: we stagger initial activation by small offsets
-    activation_schedule = []
-    t0_offset = 0.2
-    for i in range(len(rays_meta)):
-        activation_schedule.append({"ray_index": i, "start_time": i * t0_offset})
-
-    # state for active rays
-    # each active entry: { ray_index, grow_frac, particle_frac, phase, transmit_count, next_reactivate_time(opt) }
-    active_rays = []
-    current_time = 0.0
-
-    def activate_ray(meta_idx):
-        active_rays.append({
-            "ray_index": meta_idx,
-            "grow_frac": 0.0,
-            "particle_frac": 0.0,
-            "phase": "growing",      # growing -> transmitting -> finished
-            "transmit_count": 0
-        })
-
-    def schedule_reactivation(meta_idx, at_time):
-        activation_schedule.append({"ray_index": meta_idx, "start_time": at_time})
+    schedule = dict(
+        grow_speed=0.6,         # fraction/sec for ray growth (tune)
+        particle_speed=0.4,     # fraction/sec for particle progress (tune)
+        cycle_pause=2.0,        # seconds to wait between cycles for each ray
+        transmissions=4,
+        stagger=0.2,            # seconds between the first activations
+    )
+
+    if RAYS_ANIMATION == "client":
+        # Geometry and schedule go to the browser once with the document; frames are
+        # computed there and, with syncable=False, never sent back to the server
+        visible_rays_source.syncable = False
+        particles_source.syncable = False
+        doc.js_on_event(DocumentReady, CustomJS(
+            args=dict(
+                rays=visible_rays_source,
+                particles=particles_source,
+                geometry=geometry.to_client(),
+                schedule=dict(schedule, update_ms=UPDATE_MS),
+            ),
+            code=CLIENT_ANIMATION_JS,
+        ))
+        return layout
+
+    animation = RayAnimation(geometry, **schedule)
 
     def update():
-        nonlocal current_time
-        current_time += dt
-
-        # check and start scheduled activations whose time has arrived
-        for sched in activation_schedule[:]:
-            if current_time >= sched["start_time"]:
-                activate_ray(sched["ray_index"])
-                activation_schedule.remove(sched)
-
-        # prepare new arrays for visible rays and particles
-        visible_xs = []
-        visible_ys = []
-        visible_widths = []
-        p_x = []
-        p_y = []
-        p_size = []
-        p_color = []
-
-        still_active = []
-        for ar in active_rays:
-            meta = rays_meta[ar["ray_index"]]
-            if ar["phase"] == "growing":
-                ar["grow_frac"] += grow_speed * dt
-                if ar["grow_frac"] >= 1.0:
-                    ar["grow_frac"] = 1.0
-                    ar["phase"] = "transmitting"
-                    ar["particle_frac"] = 0.0
-                # draw partial polyline
-                xs_partial, ys_partial = partial_polyline(meta["pts"], ar["grow_frac"])
-                visible_xs.append(xs_partial)
-                visible_ys.append(ys_partial)
-                visible_widths.append(1.0 + 2.0*ar["grow_frac"])
-                # no particle yet (or optionally start particle early)
-            elif ar["phase"] == "transmitting":
-                # Ray is fully visible (we draw full polyline)
-                xs_full = [p[0] for p in meta["pts"]]
-                ys_full = [p[1] for p in meta["pts"]]
-                visible_xs.append(xs_full)
-                visible_ys.append(ys_full)
-                visible_widths.append(3.0)
-
-                # advance particle
-                ar["particle_frac"] += particle_speed * dt
-                if ar["particle_frac"] >= 1.0:
-                    ar["particle_frac"] = 1.0
-                # compute particle position
-                px, py = point_along_polyline(meta["pts"], ar["particle_frac"])
-                p_x.append(px); p_y.append(py)
-                p_size.append(8)
-                p_color.append("yellow")
-
-                if ar["particle_frac"] >= 1.0:
-                    # one packet completed
-                    ar["transmit_count"] += 1
-                    if ar["transmit_count"] < 4:
-                        # prepare next transmit: reset particle_frac (line stays fully visible)
-                        ar["particle_frac"] = 0.0
-                    else:
-                        # finished 4 transmissions: remove the line and schedule restart
-                        ar["phase"] = "finished"
-                        # schedule re-activation after pause
-                        schedule_reactivation(ar["ray_index"], current_time + cycle_pause)
-            # keep only rays that are still active and not 'finished'
-            if ar["phase"] in ("growing", "transmitting"):
-                still_active.append(ar)
-            else:
-                # finished - do not append (line removed). If you want to keep final lines visible, append here.
-                pass
-
-        # replace sources to trigger rendering
-        visible_rays_source.data = {"xs": visible_xs, "ys": visible_ys, "line_width": visible_widths}
-        particles_source.data = {"x": p_x, "y": p_y, "size": p_size, "color": p_color}
-
-        # update active_rays list
-        active_rays[:] = still_active
+        frame = animation.step(dt)
+        # replace sources to trigger rendering; float32 arrays are sent as binary buffers
+        visible_rays_source.data = {"xs": frame["xs"], "ys": frame["ys"], "line_width": frame["line_width"]}
+        particles_source.data = {"x": frame["particle_x"], "y": frame["particle_y"]}
 
     # initial update (nothing active yet)
     update()
     # periodic update
-    doc.add_periodic_callback(update, UPDATE_MS)
+    add_periodic_callback = add_periodic_callback or doc.add_periodic_callback
+    add_periodic_callback(measured(doc, "animate_rays", update), UPDATE_MS)
+    return layout
+
+
+def animate_rays_cycle4_app(doc: Document):
+    layout = animate_rays_panel(doc)
+    if layout is not None:
+        doc.add_root(layout)
@@ -1,21 +1,35 @@
 
 from get_data  import Database
+from views.playback import playback_clock, frame_table, LOADING_TEXT
 from bokeh.models import Slider,CustomJS
 import random
 database = Database()
 
-def rbs_assigned(doc):
-    data = database.rbs_assigned
+def rbs_assigned_panel(doc):
     
     
-    def update():
+    def update(current_index=None):
         # Directly modify the text of 'div'
-        slider.value = data.get(database.current_timestamp,0)
+        if not playback_clock.loaded:
+            slider.title = f"{title} ({LOADING_TEXT})"
+            return
+        slider.title = title
+        if current_index is None:
+            current_index = playback_clock.index
+        value = frame_table.slice_prb[current_index] if len(frame_table) else 0
+        slider.value = int(value) if value == value else 0
 
     # Initialize 'div' here so that it's in the scope of 'update'
-    slider = Slider(start=0,end=50,value=10,bar_color='blue', disabled=True,title="Rb's assigned")
+    title = "Rb's assigned"
+    slider = Slider(start=0,end=50,value=10,bar_color='blue', disabled=True,title=title)
     
 
-    doc.add_root(slider)
-    doc.add_periodic_callback(update, 500)  # Update every 250 ms
+    slider.name = "rbs_assigned"
+    update()
+    playback_clock.subscribe(doc, update)
+    return slider
+
+
+def rbs_assigned(doc):
+    doc.add_root(rbs_assigned_panel(doc))
         
\ No newline at end of file
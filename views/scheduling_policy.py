@@ -1,20 +1,25 @@
 
 from get_data  import Database
+from views.playback import playback_clock, frame_table, LOADING_TEXT
 from bokeh.models import Div
 database = Database()
 
 
 
 
-def scheduling_policy(doc):
-    data = database.scheduling_policy
+def scheduling_policy_panel(doc):
     
     
-    def update():
+    def update(current_index=None):
         try:
             # Directly modify the text of 'div'
-            
-            policy = database.map_scheduling_policy(data.get(database.current_timestamp,""))
+            if not playback_clock.loaded:
+                div.text = LOADING_TEXT
+                return
+            if current_index is None:
+                current_index = playback_clock.index
+            # Labels are mapped once when the frame table is built
+            policy = frame_table.scheduling_policy[current_index] if len(frame_table) else None
             # Defensive conversion
             if policy is None:
                 display_text = "N/A"
@@ -37,5 +42,11 @@ def scheduling_policy(doc):
     div = Div(text="")
     
 
-    doc.add_root(div)
-    doc.add_periodic_callback(update, 500)  # Update every 250 ms
\ No newline at end of file
+    div.name = "scheduling_policy"
+    update()
+    playback_clock.subscribe(doc, update)
+    return div
+
+
+def scheduling_policy(doc):
+    doc.add_root(scheduling_policy_panel(doc))
\ No newline at end of file
@@ -3,7 +3,7 @@ from bokeh.models import Switch, Div
 from bokeh.layouts import row
 
 
-def toggle_switch(doc):
+def toggle_switch_panel(doc, add_periodic_callback=None):
     
     
     def update():
@@ -18,6 +18,11 @@ def toggle_switch(doc):
     
     div = Div(text="Off")
 
-    doc.add_root(row(switch,div))
-    doc.add_periodic_callback(update, 500)  # Update every 250 ms
+    add_periodic_callback = add_periodic_callback or doc.add_periodic_callback
+    add_periodic_callback(update, 500)  # Update every 250 ms
+    return row(switch,div,name="toggle_switch")
+
+
+def toggle_switch(doc):
+    doc.add_root(toggle_switch_panel(doc))
         
\ No newline at end of file
@@ -0,0 +1,94 @@
+# views/transport.py
+"""
+Measure what the views send to the browser.
+
+With TRANSPORT_STATS=1 every view update wrapped with measured() is
+serialized the way the Bokeh server would send it (one PATCH-DOC message per
+document change) and the JSON and binary buffer bytes are added up per view.
+A summary is printed every TRANSPORT_REPORT_S seconds. Without the variable
+measured() returns the callback unchanged and costs nothing.
+"""
+import os
+import time
+from functools import partial, wraps
+
+from bokeh.protocol import Protocol
+
+TRANSPORT_STATS = os.getenv("TRANSPORT_STATS", "0") == "1"
+TRANSPORT_REPORT_S = float(os.getenv("TRANSPORT_REPORT_S", 10))
+
+
+class TransportMeter:
+    """Bytes per update for each view, summed over every session of the process."""
+
+    def __init__(self, report_interval=TRANSPORT_REPORT_S):
+        self.report_interval = report_interval
+        self.protocol = Protocol()
+        self.totals = {}      # view -> {"updates": n, "json": bytes, "binary": bytes}
+        self._updating = {}   # doc -> view whose update is running
+        self._last_report = time.monotonic()
+
+    def message_size(self, event):
+        """(JSON bytes, binary buffer bytes) of the PATCH-DOC message for one change."""
+        message = self.protocol.create("PATCH-DOC", [event])
+        json_bytes = len(message.header_json) + len(message.metadata_json) + len(message.content_json)
+        binary_bytes = sum(memoryview(buffer.data).nbytes for buffer in message.buffers)
+        return json_bytes, binary_bytes
+
+    def watch(self, doc):
+        if doc in self._updating:
+            return
+        self._updating[doc] = None
+        doc.on_change(partial(self._on_change, doc))
+        doc.on_session_destroyed(lambda session_context: self._updating.pop(doc, None))
+
+    def _on_change(self, doc, event):
+        view = self._updating.get(doc)
+        if view is None:
+            return
+        json_bytes, binary_bytes = self.message_size(event)
+        totals = self.totals[view]
+        totals["json"] += json_bytes
+        totals["binary"] += binary_bytes
+
+    def measured(self, doc, view, callback):
+        """Wrap a view's update callback so the changes it makes are counted."""
+        self.watch(doc)
+        self.totals.setdefault(view, {"updates": 0, "json": 0, "binary": 0})
+
+        @wraps(callback)
+        def wrapper(*args, **kwargs):
+            self._updating[doc] = view
+            try:
+                return callback(*args, **kwargs)
+            finally:
+                self._updating[doc] = None
+                self.totals[view]["updates"] += 1
+                self.maybe_report()
+
+        return wrapper
+
+    def maybe_report(self):
+        now = time.monotonic()
+        if now - self._last_report < self.report_interval:
+            return
+        self._last_report = now
+        for view, totals in sorted(self.totals.items()):
+            updates = totals["updates"]
+            if not updates:
+                continue
+            print(
+                f"[transport] {view}: {updates} updates, "
+                f"{(totals['json'] + totals['binary']) / updates:.0f} B/update "
+                f"(json {totals['json'] / updates:.0f}, binary {totals['binary'] / updates:.0f})"
+            )
+            totals.update(updates=0, json=0, binary=0)
+
+
+transport_meter = TransportMeter()
+
+
+def measured(doc, view, callback):
+    if not TRANSPORT_STATS:
+        return callback
+    return transport_meter.measured(doc, view, callback)